@@ -0,0 +1,145 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import abc
+
+class AsyncISPI:
+    '''
+    Interface class for SPI bus connections driven from an asyncio event
+    loop. The awaitable counterpart of ISPI, with the same buffer rules: 
+    transmit data may be any buffer-protocol object and caller provided 
+    receive buffers are filled in place and returned.
+
+    Blocking ISPI implementations are adapted with SPI_executor.
+    '''
+
+    @abc.abstractclassmethod
+    async def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
+        '''
+        Performs a SPI Read/Write Transaction
+
+        :param xmit: Bytes to transmit
+        :param rx: Optional writable buffer, same length as xmit, to receive
+                   into
+        :return: Bytes received, will be same length as xmit. This is rx when
+                 it was provided
+        '''
+        pass
+
+    @abc.abstractclassmethod
+    async def Read(self, count: int, rx: bytearray = None) -> bytes:
+        '''
+        Performs a SPI Read Only Transaction
+
+        :param count: Number of bytes to read
+        :param rx: Optional writable buffer of count bytes to receive into
+        :return: Bytes read. This is rx when it was provided
+        '''
+        pass
+
+    @abc.abstractclassmethod
+    async def Write(self, xmit: bytes) -> int:
+        '''
+        Performs a SPI Write Only Transaction
+
+        :param xmit: Bytes to transmit
+        :return: Number of bytes transmitted
+        '''
+        pass
+
+    async def Transfer(self, frames: list, rx_frames: list = None) -> list:
+        '''
+        Performs a batch of SPI Read/Write Transactions. Chip select is
+        released between each frame.
+
+        The default implementation awaits ReadWrite frame by frame.
+
+        :param frames: List of frames, each a bytes-like object to transmit
+        :param rx_frames: Optional list of writable buffers, one per frame, to
+                          receive into
+        :return: List of received frames, same order and lengths as frames.
+                 This is rx_frames when it was provided
+        '''
+        if rx_frames is None:
+            return [await self.ReadWrite(frame) for frame in frames]
+
+        for frame, rx in zip(frames, rx_frames):
+            await self.ReadWrite(frame, rx)
+        return rx_frames
+
+    async def RunBlocking(self, function):
+        '''
+        Runs a blocking function against the ISPI interface underneath, for
+        exercises with no async implementation. Interfaces without a blocking
+        counterpart can't
+
+        :param function: function(ISPI) to run
+        :return: Return value of function
+        '''
+        raise Exception('This interface has no blocking counterpart')
+
+    @abc.abstractclassmethod
+    async def Cleanup(self) -> None:
+        '''
+        Cleans up any open resources
+        '''
+        pass
+
+    @abc.abstractclassmethod
+    async def SetMode(self, mode: int) -> None:
+        '''
+        Sets the SPI mode (Phase/Polarity) of the bus
+
+        :param mode: Mode to set (0-3)
+        '''
+        pass
+
+    @abc.abstractclassmethod
+    async def SetSpeed(self, speed: int) -> None:
+        '''
+        Sets the SPI bus speed in Hz
+
+        :param speed: Clock speed in Hz
+        '''
+        pass
+
+    async def SetWordDelay(self, usecs: int) -> None:
+        '''
+        Sets a delay between the bytes of each frame. Interfaces which can't
+        delay between bytes only accept 0
+
+        :param usecs: Delay in microseconds
+        '''
+        if usecs != 0:
+            raise Exception('Word delay is not supported by this interface')
@@ -0,0 +1,296 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import collections
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+#File header, the last byte is the format version
+CAPTURE_MAGIC = b'SPICAP\x00\x01'
+
+#Record header: timestamp (ns since the epoch), frequency (Hz), bus, data
+#length, mode (0xFF before one was set), chip select and flags. The 
+#transmitted then received bytes follow, each of data length unless 
+#flagged as not stored
+RECORD_HEADER = struct.Struct('<QIIIBBB')
+
+#Record flags
+CAPTURE_NO_TX = 0x01    #Read only transaction, zeros were transmitted
+CAPTURE_NO_RX = 0x02    #Write only transaction, nothing was received
+
+#Mode recorded before the interface's mode was set
+CAPTURE_NO_MODE = 0xFF
+
+#A captured transaction. tx and rx are memoryviews into the mapped file, 
+#None when not stored
+CaptureRecord = collections.namedtuple('CaptureRecord', 
+    ['timestamp_ns', 'freq', 'mode', 'bus', 'cs', 'tx', 'rx'])
+
+def _ParseRecord(view: memoryview, offset: int) -> tuple:
+    '''
+    Parses the record at an offset of a mapped log
+
+    :param view: View of the whole log
+    :param offset: Offset of the record header
+    :return: Tuple of (header fields, tx view or None, rx view or None, 
+             offset of the next record), or None if the record is cut short
+    '''
+    size = len(view)
+    if offset + RECORD_HEADER.size > size:
+        return None
+
+    header = RECORD_HEADER.unpack_from(view, offset)
+    length = header[3]
+    flags = header[6]
+    offset += RECORD_HEADER.size
+
+    tx = None
+    if not (flags & CAPTURE_NO_TX):
+        tx = view[offset:offset + length]
+        offset += length
+    rx = None
+    if not (flags & CAPTURE_NO_RX):
+        rx = view[offset:offset + length]
+        offset += length
+    if offset > size:
+        return None
+    return (header, tx, rx, offset)
+
+class CaptureWriter:
+    '''
+    Appends transactions to a binary capture log. Records are a fixed 23
+    byte header followed by the raw transmitted and received bytes, so
+    capturing costs a struct pack and buffered writes per transaction. 
+    Writers are thread safe, several interfaces may share one.
+
+    Like Trace, capturing is enabled by setting CaptureWriter.active, which
+    CreateInterface wraps every interface with.
+    '''
+
+    #Active capture, None when capturing is disabled
+    active = None
+
+    def __init__(self, path: str) -> None:
+        '''
+        Class constructor. Opens the log for appending, creating it if needed.
+        A record cut short by an earlier capture being interrupted is
+        truncated away, so the new records follow the last complete one
+
+        :param path: Capture log file
+        '''
+        if (not os.path.exists(path)) or (os.path.getsize(path) == 0):
+            self.__file = open(path, 'wb')
+            self.__file.write(CAPTURE_MAGIC)
+        else:
+            self.__file = open(path, 'r+b')
+            try:
+                end = self.__CompleteLength(path)
+            except Exception:
+                self.__file.close()
+                raise
+            self.__file.truncate(end)
+            self.__file.seek(end)
+        self.__lock = threading.Lock()
+
+    def __CompleteLength(self, path: str) -> int:
+        '''
+        Finds the end of the last complete record of the open log
+
+        :param path: Capture log file, for errors
+        :return: Length of the log up to the end of the last complete record
+        '''
+        if os.fstat(self.__file.fileno()).st_size < len(CAPTURE_MAGIC):
+            raise Exception('%s is not a capture log' % path)
+
+        with mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                if view[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+                    raise Exception('%s is not a capture log' % path)
+
+                offset = len(CAPTURE_MAGIC)
+                while True:
+                    parsed = _ParseRecord(view, offset)
+                    if parsed is None:
+                        break
+                    offset = parsed[3]
+                    #Release the record's views before the map closes
+                    for data in parsed[1:3]:
+                        if data is not None:
+                            data.release()
+
+                if offset < len(view):
+                    logging.warning('Dropped %d bytes of an interrupted record from %s',
+                                    len(view) - offset, path)
+                return offset
+
+    @staticmethod
+    def Enable(path: str) -> None:
+        '''
+        Enables capturing to a log
+
+        :param path: Capture log file
+        '''
+        CaptureWriter.active = CaptureWriter(path)
+
+    @staticmethod
+    def Disable() -> None:
+        '''
+        Disables capturing, closing the active log
+        '''
+        if CaptureWriter.active is not None:
+            CaptureWriter.active.Close()
+        CaptureWriter.active = None
+
+    def Write(self, freq: int, mode: int, bus: int, cs: int, 
+              xmit: bytes, rx: bytes) -> None:
+        '''
+        Appends a transaction
+
+        :param freq: SPI clock frequency in Hz
+        :param mode: SPI mode, None if not set
+        :param bus: Bus number of the interface
+        :param cs: Chip select number of the interface
+        :param xmit: Transmitted bytes, None for a read only transaction
+        :param rx: Received bytes, None for a write only transaction
+        '''
+        with self.__lock:
+            self.__Write(time.time_ns(), freq, mode, bus, cs, xmit, rx)
+
+    def WriteBatch(self, freq: int, mode: int, bus: int, cs: int, 
+                   frames: list, rx_frames: list) -> None:
+        '''
+        Appends a batch of read/write transactions, all with the time the 
+        batch completed
+
+        :param freq: SPI clock frequency in Hz
+        :param mode: SPI mode, None if not set
+        :param bus: Bus number of the interface
+        :param cs: Chip select number of the interface
+        :param frames: List of transmitted frames
+        :param rx_frames: List of received frames
+        '''
+        timestamp = time.time_ns()
+        with self.__lock:
+            for xmit, rx in zip(frames, rx_frames):
+                self.__Write(timestamp, freq, mode, bus, cs, xmit, rx)
+
+    def Close(self) -> None:
+        '''
+        Flushes and closes the log
+        '''
+        with self.__lock:
+            self.__file.close()
+
+    def __Write(self, timestamp: int, freq: int, mode: int, bus: int, cs: int,
+                xmit: bytes, rx: bytes) -> None:
+        '''
+        Appends a transaction, lock must be held
+        '''
+        flags = 0
+        if xmit is None:
+            flags |= CAPTURE_NO_TX
+            length = len(rx)
+        else:
+            length = len(xmit)
+        if rx is None:
+            flags |= CAPTURE_NO_RX
+
+        self.__file.write(RECORD_HEADER.pack(timestamp, freq or 0, bus, length,
+            CAPTURE_NO_MODE if mode is None else mode, cs, flags))
+        if xmit is not None:
+            self.__file.write(xmit)
+        if rx is not None:
+            self.__file.write(rx)
+
+
+class CaptureReader:
+    '''
+    Reads a binary capture log through a memory map, so logs larger than
+    RAM can be read and records are handed out as views into the file 
+    without copying.
+    '''
+
+    def __init__(self, path: str) -> None:
+        '''
+        Class constructor. Maps the log
+
+        :param path: Capture log file
+        '''
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < len(CAPTURE_MAGIC):
+                raise Exception('%s is not a capture log' % path)
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.__view = memoryview(self.__map)
+        if self.__view[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            self.Close()
+            raise Exception('%s is not a capture log' % path)
+
+    def __iter__(self):
+        return self.Records()
+
+    def Records(self, bus: int = None, cs: int = None):
+        '''
+        Iterates the records in the order they were captured. A record cut
+        short by the capture being interrupted ends the iteration
+
+        :param bus: Only return the records of this bus, None for all
+        :param cs: Only return the records of this chip select, None for all
+        :return: Generator of CaptureRecords
+        '''
+        view = self.__view
+        offset = len(CAPTURE_MAGIC)
+
+        while True:
+            parsed = _ParseRecord(view, offset)
+            if parsed is None:
+                return
+            ((timestamp, freq, rec_bus, length, mode, rec_cs, flags), 
+             tx, rx, offset) = parsed
+
+            if ((bus is None) or (bus == rec_bus)) and ((cs is None) or (cs == rec_cs)):
+                yield CaptureRecord(timestamp, freq, 
+                                    None if mode == CAPTURE_NO_MODE else mode,
+                                    rec_bus, rec_cs, tx, rx)
+
+    def Close(self) -> None:
+        '''
+        Unmaps the log. Records handed out must no longer be in use
+        '''
+        self.__view.release()
+        self.__map.close()
@@ -0,0 +1,157 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import collections
+import sys
+import threading
+import numpy
+
+#A kept frame: its index among all frames verified, the full frame length,
+#the stored expected and received bytes and whether it failed
+CapturedFrame = collections.namedtuple('CapturedFrame', 
+    ['index', 'length', 'expected', 'received', 'failed'])
+
+class ErrorCapture:
+    '''
+    Keeps the verified frames around each failed frame in a fixed size ring,
+    so a long run can show what led up to and followed its errors without
+    holding every frame. ExerciseResult passes it each block it verifies 
+    along with the block's failed frames, and only blocks with failures cost
+    more than a counter update.
+
+    Like Trace, capturing is enabled by setting ErrorCapture.active:
+
+        if ErrorCapture.active is not None:
+            ErrorCapture.active.Add(expected, received, failed)
+    '''
+
+    #Active capture, None when capturing is disabled
+    active = None
+
+    def __init__(self, slots: int, context: int, slot_bytes: int = 16,
+                 stream = None) -> None:
+        '''
+        Class constructor.
+
+        :param slots: Number of frames held, older ones are dropped
+        :param context: Frames kept either side of each failed frame
+        :param slot_bytes: Bytes stored per direction per frame, longer
+                           frames are truncated
+        :param stream: Text stream dumps are written to, defaults to stderr
+        '''
+        self.__stream = sys.stderr if stream is None else stream
+        self.__frames = collections.deque(maxlen=slots)
+        self.__context = context
+        self.__window = numpy.ones(2 * context + 1, dtype=numpy.int32)
+        self.__slot_bytes = slot_bytes
+        #Frames verified in total, so kept frames can be placed in the run
+        self.__verified = 0
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def Enable(slots: int, context: int, slot_bytes: int = 16, 
+               stream = None) -> None:
+        '''
+        Enables capturing with a new ring
+
+        :param slots: Number of frames held
+        :param context: Frames kept either side of each failed frame
+        :param slot_bytes: Bytes stored per direction per frame
+        :param stream: Text stream dumps are written to, defaults to stderr
+        '''
+        ErrorCapture.active = ErrorCapture(slots, context, slot_bytes, stream)
+
+    @staticmethod
+    def Disable() -> None:
+        '''
+        Disables capturing
+        '''
+        ErrorCapture.active = None
+
+    def Add(self, expected, received, failed: numpy.ndarray) -> None:
+        '''
+        Adds a verified block, keeping the frames around any failures
+
+        :param expected: Expected frames, a list of bytes-like frames or a
+                         (frames, width) uint8 array
+        :param received: Received frames, in the same form as expected
+        :param failed: Boolean array, True for each frame with an error
+        '''
+        with self.__lock:
+            first = self.__verified
+            self.__verified += len(failed)
+            if not failed.any():
+                return
+
+            #Every frame within context of a failure, overlaps merged. The
+            #full convolution is cut back to the block, which may be
+            #shorter than the window
+            near = numpy.convolve(failed.astype(numpy.int32), self.__window, 'full')
+            near = near[self.__context:self.__context + len(failed)] > 0
+            stored = self.__slot_bytes
+            for i in numpy.flatnonzero(near):
+                self.__frames.append(CapturedFrame(first + int(i), len(expected[i]),
+                                                   bytes(expected[i][:stored]),
+                                                   bytes(received[i][:stored]),
+                                                   bool(failed[i])))
+
+    def Dump(self, title: str = None) -> None:
+        '''
+        Formats and writes the frames kept since the last dump, oldest first,
+        with a gap marker between runs of frames. Does nothing if there are
+        none
+
+        :param title: Optional title for the dump
+        '''
+        stream = self.__stream
+        with self.__lock:
+            if not self.__frames:
+                return
+
+            stream.write('--- Errors: %d frames kept%s ---\n' % 
+                         (len(self.__frames), '' if title is None else (', ' + title)))
+
+            last = None
+            for frame in self.__frames:
+                if (last is not None) and (frame.index != last + 1):
+                    stream.write('...\n')
+                more = ' ...' if frame.length > len(frame.expected) else ''
+                stream.write('#%-8d Expected: %s%s Got: %s%s%s\n' % 
+                    (frame.index, frame.expected.hex(' '), more, 
+                     frame.received.hex(' '), more, 
+                     '  <- error' if frame.failed else ''))
+                last = frame.index
+
+            self.__frames.clear()
+            stream.flush()
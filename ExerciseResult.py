@@ -0,0 +1,314 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import numpy
+from ErrorCapture import ErrorCapture
+
+#Buckets of the error burst length histogram, bucket i counts bursts of
+#2^i to 2^(i+1)-1 consecutive failed frames, the last bucket everything longer
+BURST_BUCKETS = 16
+
+#Version of the ToDict layout. Bump it whenever the result's fields or the
+#bus_stats keys change, so stored results of the old layout are measured
+#again
+RESULT_VERSION = 1
+
+#Fields held as numpy arrays, stored as lists by ToDict
+ARRAY_FIELDS = [ 'bit_position_errors', 'byte_offset_errors', 'error_bursts' ]
+
+class ExerciseResult:
+    '''
+    Results of an exercise run. Along with the frame success rate, tracks the
+    number of bits compared and where the bit errors fell, to separate
+    sampling/phase problems (single bit slips at the MSB or LSB) from whole
+    byte corruption.
+    '''
+
+    def __init__(self) -> None:
+        '''
+        Class constructor. Creates an empty result
+        '''
+        #SPI mode the exercise ran in and the number of frames transferred,
+        #including frames which weren't verified
+        self.mode = None
+        self.transfer_count = 0
+
+        #Host wall time of the exercise in seconds, filled in by the runner
+        self.wall_time = 0.0
+
+        #Bus statistics from SPI_instrumented.Stats(), filled in by the runner
+        #when the interface is instrumented
+        self.bus_stats = None
+
+        #Payload bytes streamed and the time spent transferring them, for
+        #exercisers measuring sustained throughput
+        self.payload_bytes = 0
+        self.payload_time = 0.0
+
+        #Reads made at a device's output data rate, how many returned a new
+        #sample or the previous sample again by the device's data ready flag,
+        #and the samples missed between reads estimated from the host's read
+        #timing, for exercisers streaming device data
+        self.stream_reads = 0
+        self.stream_samples = 0
+        self.stream_duplicated = 0
+        self.stream_dropped = 0
+
+        #Number of exercise runs merged into the result, and the sequential
+        #test decision (SequentialTest SPRT_ value) when the runner stops early
+        self.rounds = 1
+        self.decision = None
+
+        #Test pattern and seed the exercise sent, for exercisers using them
+        self.pattern = None
+        self.seed = None
+
+        #Delay between bytes (us) the exercise ran with in a matrix run
+        self.word_delay = None
+
+        #True when the result was loaded from a ResultCache rather than run
+        self.cached = False
+
+        #Number of frames verified and how many were error free
+        self.test_count = 0
+        self.success_count = 0
+
+        #Number of bits verified and how many were wrong
+        self.bits_compared = 0
+        self.bit_errors = 0
+
+        #Bit errors by bit position in the byte, index 0 is the MSB (bit 7)
+        self.bit_position_errors = numpy.zeros(8, dtype=numpy.int64)
+
+        #Bit errors by byte offset within the verified data of each frame
+        self.byte_offset_errors = numpy.zeros(0, dtype=numpy.int64)
+
+        #Runs of consecutive failed frames by length, see BURST_BUCKETS, and
+        #the longest run
+        self.error_bursts = numpy.zeros(BURST_BUCKETS, dtype=numpy.int64)
+        self.max_burst = 0
+
+    def AddBlock(self, expected: numpy.ndarray, 
+                 received: numpy.ndarray) -> numpy.ndarray:
+        '''
+        Verifies a block of equal length frames
+
+        :param expected: (frames, width) uint8 array of the expected data
+        :param received: (frames, width) uint8 array of the received data
+        :return: Boolean array, True for each frame with an error
+        '''
+        failed = self.__VerifyBlock(expected, received)
+        self.__AddBursts(failed)
+        if ErrorCapture.active is not None:
+            ErrorCapture.active.Add(expected, received, failed)
+        return failed
+
+    def __VerifyBlock(self, expected: numpy.ndarray, 
+                      received: numpy.ndarray) -> numpy.ndarray:
+        '''
+        Verifies a block of equal length frames, without counting bursts
+
+        :param expected: (frames, width) uint8 array of the expected data
+        :param received: (frames, width) uint8 array of the received data
+        :return: Boolean array, True for each frame with an error
+        '''
+        diff = numpy.bitwise_xor(expected, received)
+        (frames, width) = diff.shape
+
+        #(frames, width * 8) array, 1 for every bit in error
+        error_bits = numpy.unpackbits(diff, axis=1).reshape(frames, width, 8)
+
+        failed = diff.any(axis=1)
+        self.test_count += frames
+        self.success_count += frames - int(numpy.count_nonzero(failed))
+        self.bits_compared += diff.size * 8
+        self.bit_errors += int(numpy.count_nonzero(error_bits))
+        self.bit_position_errors += error_bits.sum(axis=(0, 1), dtype=numpy.int64)
+
+        if width > len(self.byte_offset_errors):
+            self.byte_offset_errors = numpy.pad(self.byte_offset_errors, 
+                (0, width - len(self.byte_offset_errors)))
+        self.byte_offset_errors[:width] += error_bits.sum(axis=(0, 2), dtype=numpy.int64)
+
+        return failed
+
+    def AddFrames(self, expected: list, received: list) -> numpy.ndarray:
+        '''
+        Verifies a list of frames, which may differ in length. Frames are
+        grouped by length and verified a block at a time
+
+        :param expected: List of bytes-like expected data
+        :param received: List of bytes-like received data
+        :return: Boolean array, True for each frame with an error
+        '''
+        failed = numpy.zeros(len(expected), dtype=bool)
+
+        by_width = {}
+        for i in range(0, len(expected)):
+            by_width.setdefault(len(expected[i]), []).append(i)
+
+        for width, indexes in by_width.items():
+            exp_block = numpy.frombuffer(
+                b''.join(expected[i] for i in indexes), dtype=numpy.uint8)
+            rcv_block = numpy.frombuffer(
+                b''.join(received[i] for i in indexes), dtype=numpy.uint8)
+            failed[indexes] = self.__VerifyBlock(exp_block.reshape(-1, width),
+                                                 rcv_block.reshape(-1, width))
+
+        #Bursts run in frame order, across the width groups
+        self.__AddBursts(failed)
+        if ErrorCapture.active is not None:
+            ErrorCapture.active.Add(expected, received, failed)
+        return failed
+
+    def __AddBursts(self, failed: numpy.ndarray) -> None:
+        '''
+        Adds the runs of consecutive failed frames to the burst histogram
+
+        :param failed: Boolean array in frame order, True for each failed frame
+        '''
+        if not failed.any():
+            return
+
+        #+1 where a run starts, -1 just after it ends
+        edges = numpy.diff(failed.astype(numpy.int8), prepend=0, append=0)
+        lengths = numpy.flatnonzero(edges < 0) - numpy.flatnonzero(edges > 0)
+
+        #frexp exponent - 1 is floor(log2(length))
+        buckets = numpy.minimum(numpy.frexp(lengths)[1] - 1, BURST_BUCKETS - 1)
+        numpy.add.at(self.error_bursts, buckets, 1)
+        self.max_burst = max(self.max_burst, int(lengths.max()))
+
+    def Merge(self, other: 'ExerciseResult') -> None:
+        '''
+        Adds the counts of another run of the same exercise to this result
+
+        :param other: Result to add
+        '''
+        self.rounds += other.rounds
+        self.transfer_count += other.transfer_count
+        self.wall_time += other.wall_time
+        self.test_count += other.test_count
+        self.success_count += other.success_count
+        self.bits_compared += other.bits_compared
+        self.bit_errors += other.bit_errors
+        self.bit_position_errors += other.bit_position_errors
+
+        width = len(other.byte_offset_errors)
+        if width > len(self.byte_offset_errors):
+            self.byte_offset_errors = numpy.pad(self.byte_offset_errors, 
+                (0, width - len(self.byte_offset_errors)))
+        self.byte_offset_errors[:width] += other.byte_offset_errors
+
+        self.error_bursts += other.error_bursts
+        self.max_burst = max(self.max_burst, other.max_burst)
+
+        self.payload_bytes += other.payload_bytes
+        self.payload_time += other.payload_time
+        self.stream_reads += other.stream_reads
+        self.stream_samples += other.stream_samples
+        self.stream_duplicated += other.stream_duplicated
+        self.stream_dropped += other.stream_dropped
+
+    def ToDict(self) -> dict:
+        '''
+        :return: JSON serializable dictionary of every field, with the
+                 RESULT_VERSION it was written with
+        '''
+        record = dict(vars(self))
+        for key in ARRAY_FIELDS:
+            record[key] = record[key].tolist()
+        record['version'] = RESULT_VERSION
+        return record
+
+    @staticmethod
+    def FromDict(record: dict) -> 'ExerciseResult':
+        '''
+        Rebuilds a result from ToDict
+
+        :param record: Dictionary from ToDict
+        :return: Result, None if the dictionary is from another RESULT_VERSION
+        '''
+        if record.get('version') != RESULT_VERSION:
+            return None
+
+        result = ExerciseResult()
+        for key, value in record.items():
+            if key == 'version':
+                continue
+            if key in ARRAY_FIELDS:
+                value = numpy.array(value, dtype=numpy.int64)
+            setattr(result, key, value)
+        return result
+
+    def SuccessRate(self) -> float:
+        '''
+        :return: Frame success rate (0.0-1.0)
+        '''
+        if self.test_count == 0:
+            return 0.0
+        return float(self.success_count) / float(self.test_count)
+
+    def BitErrorRate(self) -> float:
+        '''
+        :return: Bit error rate, bit errors over bits compared
+        '''
+        if self.bits_compared == 0:
+            return 0.0
+        return float(self.bit_errors) / float(self.bits_compared)
+
+    def TransfersPerSecond(self) -> float:
+        '''
+        :return: Achieved transfers per second over the exercise wall time
+        '''
+        if self.wall_time <= 0.0:
+            return 0.0
+        return float(self.transfer_count) / self.wall_time
+
+    def PayloadThroughput(self) -> float:
+        '''
+        :return: Payload bytes per second over the payload transfer time
+        '''
+        if self.payload_time <= 0.0:
+            return 0.0
+        return float(self.payload_bytes) / self.payload_time
+
+    def PayloadUtilization(self, freq: int) -> float:
+        '''
+        :param freq: SPI clock frequency in Hz
+        :return: Payload throughput over the theoretical freq / 8 bytes per second
+        '''
+        if freq <= 0:
+            return 0.0
+        return self.PayloadThroughput() / (freq / 8.0)
@@ -33,56 +33,123 @@
  * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 import logging
-from IExerciser import IExerciser
+import numpy
+from IExerciser import IExerciser, ExerciseBatch, ExercisePlan, RunPlan, ReceivedBlock
 from ISPI       import ISPI
+from ExerciseResult import ExerciseResult
+
+#Readback enable of the GPIO write data register
+READBACK_CMD = bytes((0x38, 0x60))
+
+#No operation, used to clock out readback data
+NOP_CMD = bytes((0x00, 0x00))
+
+#Pin values written per batch, so results are checked as the exercise runs
+BATCH_VALUES = 32
 
 class Exerciser_AD5592r(IExerciser):
     '''
     Exerciser for communication with AD5592.  Exericser performs device 
     configurations and readbacks to verify bus traffic
     '''
-    def __init__(self) -> None:
+    def __init__(self, pipelined: bool = False, mode: int = 1) -> None:
+        '''
+        Class constructor.
+
+        :param pipelined: Clock each readback out with the next value's pin
+                          write instead of a NOP, 2 frames per value rather
+                          than 3
+        :param mode: SPI mode to run in. The device operates in mode 1, other
+                     modes are for characterizing the bus
+        '''
         super().__init__()
+        self.__pipelined = pipelined
+        self.__mode = mode
 
-    def RunExercise(self, iface: ISPI ) -> float:
+    def RunExercise(self, iface: ISPI ) -> ExerciseResult:
         '''
         Runs the AD5592r Exercises.
-        Configures the Output pin register to 0x01 - 0xFE, performs readback and
-        verfies the data.
 
         NOTE: Device operates in SPI mode 1
 
         :param ISPI: SPI Interface to exercise against
-        :return: Success rate
+        :return: Exercise results
+        '''
+        return RunPlan(iface, self.BuildExercise())
+
+    def BuildExercise(self) -> ExercisePlan:
         '''
-        iface.SetMode(1)
+        Builds the AD5592r Exercises.
+        Configures the Output pin register to 0x01 - 0xFE, performs readback and
+        verfies the data.
 
-        test_count = 0
-        success_count = 0
+        :return: Built exercise
+        '''
+        result = ExerciseResult()
+        result.mode = self.__mode
 
         #Avoid 0x00 and 0xFF as they presumably may give a false positive
-        for pins in range(0x1, 0xFF):
-            #increment the test count
-            test_count += 1
+        pin_values = numpy.arange(0x1, 0xFF, dtype=numpy.uint8)
 
-            #Set Output Pins
-            msg = [0x40, pins]
-            iface.Write(msg)
+        #Build the full set of frames up front so they can go out as a batch
+        frames = []
+        for pins in pin_values:
+            #Set Output Pins. When pipelined this also clocks out the readback
+            #of the previous value
+            frames.append(bytes((0x40, pins)))
 
             #Configure Register Readback
-            msg = [0x38, 0x60]
-            iface.Write(msg)
-            
-            #Read back the Output config
-            result = iface.Read(2)
-            logging.info('Received %s' % str(result))
-
-            if result[1] == pins:
-                success_count += 1
-                logging.info('Valid Data 0x%02X' % result[1])
-            else:
-                logging.warning('Expected 0x%02X, got 0x%02X' % (pins, result[1]))
-
-        logging.info('%d Tests / %d Success' % (test_count, success_count))
-
-        return float(success_count) / float(test_count)
\ No newline at end of file
+            frames.append(READBACK_CMD)
+
+            if not self.__pipelined:
+                #Read back the Output config, NOP command clocks out the data
+                frames.append(NOP_CMD)
+
+        if self.__pipelined:
+            #Clock out the readback of the last value
+            frames.append(NOP_CMD)
+
+        #Every 3rd frame holds the readback, or every 2nd one frame behind
+        #the readback command when pipelined
+        stride = 2 if self.__pipelined else 3
+        readback_rows = numpy.arange(len(pin_values)) * stride + 2
+
+        batches = []
+        for first in range(0, len(pin_values), BATCH_VALUES):
+            start = first * stride
+            end = (first + BATCH_VALUES) * stride
+            if end >= len(pin_values) * stride:
+                end = len(frames)
+            batches.append(self.__Batch(frames[start:end], start, end,
+                                        pin_values, readback_rows))
+
+        return ExercisePlan(self.__mode, result, batches)
+
+    def __Batch(self, frames: list, start: int, end: int,
+                pin_values: numpy.ndarray, 
+                readback_rows: numpy.ndarray) -> ExerciseBatch:
+        '''
+        :param frames: Frames of the batch
+        :param start: Index of the batch's first frame in the exercise
+        :param end: Index after the batch's last frame in the exercise
+        :param pin_values: Pin values of the whole exercise
+        :param readback_rows: Index of the frame holding each value's readback
+        :return: Batch verifying the readbacks received in its frames. When
+                 pipelined the last value's readback is in the next batch
+        '''
+        in_batch = (readback_rows >= start) & (readback_rows < end)
+        values = pin_values[in_batch]
+        rows = readback_rows[in_batch] - start
+
+        def Verify(result: ExerciseResult, rx_frames: list) -> None:
+            #All frames are 2 bytes, so the batch is received as rows of a
+            #single block. The output pins are the low byte
+            readback = ReceivedBlock(rx_frames, (len(frames), 2))[rows, 1:]
+            failed = result.AddBlock(values.reshape(-1, 1), readback)
+
+            if logging.getLogger().isEnabledFor(logging.WARNING):
+                for index in numpy.flatnonzero(failed):
+                    logging.warning('Expected 0x%02X, got 0x%02X', 
+                                    values[index], readback[index, 0])
+
+        return ExerciseBatch(frames, None, Verify)
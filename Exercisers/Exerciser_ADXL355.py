@@ -33,9 +33,13 @@
  * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 import logging
-import random
-from IExerciser import IExerciser
+import time
+import numpy
+from IExerciser import IExerciser, ExerciseBatch, ExercisePlan, RunPlan
 from ISPI       import ISPI
+from ExerciseResult import ExerciseResult
+from Trace import Trace
+from Patterns import GetPattern
 
 #Registers with fixed data values
 # Reg: Value
@@ -43,77 +47,284 @@ FIXED_REG_VALUES = { 0x00: 0xAD,
                      0x01: 0x1D,
                      0x02: 0xED }
 
+#Offset registers, OFFSET_X_H through OFFSET_Z_L
+OFFSET_REG = 0x1E
+OFFSET_LEN = 6
+
+#Measurement and configuration registers
+STATUS_REG       = 0x04
+FIFO_ENTRIES_REG = 0x05
+ZDATA1_REG       = 0x10
+FIFO_DATA_REG    = 0x11
+FILTER_REG       = 0x28
+POWER_CTL_REG    = 0x2D
+
+#STATUS data ready bit
+STATUS_DATA_RDY = 0x01
+
+#FIFO entry flags, in the last byte of each 3 byte entry
+FIFO_X_MARKER = 0x01
+FIFO_EMPTY    = 0x02
+
+#Output data rates (Hz) and their FILTER ODR_LPF codes
+ODR_CODES = { 4000: 0, 2000: 1, 1000: 2, 500: 3, 250: 4, 125: 5 }
+
+#Iterations of the register exercises
+ITERATIONS = 50
+
+#Iterations per batch, so results are checked as the exercise runs
+BATCH_ITERATIONS = 5
+
 class Exerciser_ADXL355(IExerciser):
-    def __init__(self) -> None:
+    def __init__(self, burst: bool = False, stream_reads: int = 0, 
+                 odr: int = 1000, pattern: str = 'random', seed: int = 0,
+                 mode: int = 0) -> None:
+        '''
+        Class constructor.
+
+        :param burst: Verify whole register windows in single transactions
+                      rather than a register per transaction
+        :param stream_reads: Number of data register reads made at the output
+                             data rate to count duplicated samples and 
+                             estimate dropped ones. 0 skips the stream test
+        :param odr: Output data rate (Hz) of the stream test, one of ODR_CODES
+        :param pattern: Test pattern the offset register data is cut from,
+                        one of Patterns.PATTERN_NAMES
+        :param seed: Seed of the test pattern
+        :param mode: SPI mode to run in. The device operates in mode 0, other
+                     modes are for characterizing the bus
+        '''
         super().__init__()
+        self.__mode = mode
+        self.__burst = burst
+        self.__stream_reads = stream_reads
+        self.__odr = odr
+        self.__pattern = pattern
+        self.__seed = seed
 
-    def RunExercise(self, iface: ISPI ) -> float:
+    def RunExercise(self, iface: ISPI ) -> ExerciseResult:
         '''
-        Runs the ADXL355 Exercises.
-        Reads the fixed register values as a single payload and individual bytes.
-        Writes random data to the offset registers and reads back
+        Runs the ADXL355 Exercises, then the stream test when enabled.
 
         NOTE: Device operates in SPI Mode 0
 
         :param ISPI: SPI Interface to exercise against
-        :return: Success rate
+        :return: Exercise results
         '''        
-        iface.SetMode(0)
+        result = RunPlan(iface, self.__BuildPlan())
+
+        if self.__stream_reads > 0:
+            self.__RunStream(iface, result)
 
-        test_count = 0
-        success_count = 0
+        return result
 
-        random.seed()
+    def BuildExercise(self) -> ExercisePlan:
+        '''
+        :return: Built register exercises, None with the stream test, which
+                 is paced by the output data rate rather than sent as batches
+        '''
+        if self.__stream_reads > 0:
+            return None
+        return self.__BuildPlan()
+
+    def __BuildPlan(self) -> ExercisePlan:
+        '''
+        Builds the ADXL355 register exercises.
+        Reads the fixed register values as a single payload and individual bytes.
+        Writes the test pattern to the offset registers and reads back.
+        In burst mode the offset registers are read back as a single payload.
+
+        :return: Built exercise
+        '''
+        result = ExerciseResult()
+        result.mode = self.__mode
+        result.pattern = self.__pattern
+        result.seed = self.__seed
+
+        #Offset register data of every iteration
+        offset_data = GetPattern(self.__pattern, ITERATIONS * OFFSET_LEN, self.__seed)
 
         #for the ADXL355, Address is bits 7:1 and Bit 0 is R / Wn
 
-        for iters in range(0, 50): #arbitrarily 50 iterations
+        #Build the full set of frames up front so they can go out as a batch.
+        #expected holds the data expected from byte 1 onwards of each frame's
+        #response, or None for write only frames
+        if self.__burst:
+            (frames, expected) = self.__BuildBurstFrames(offset_data)
+        else:
+            (frames, expected) = self.__BuildFrames(offset_data)
+
+        #Every iteration has the same number of frames. An iteration's frames
+        #stay in one batch, as its reads check its own writes
+        per_batch = len(frames) // ITERATIONS * BATCH_ITERATIONS
+        batches = [self.__Batch(frames[first:first + per_batch], 
+                                expected[first:first + per_batch])
+                   for first in range(0, len(frames), per_batch)]
+
+        return ExercisePlan(self.__mode, result, batches)
+
+    def __Batch(self, frames: list, expected: list) -> ExerciseBatch:
+        '''
+        :param frames: Frames of the batch
+        :param expected: Data expected from byte 1 onwards of each frame's
+                         response, or None for write only frames
+        :return: Batch verifying the data of every read
+        '''
+        def Verify(result: ExerciseResult, received: list) -> None:
+            #Collect the data portion of every read for verification
+            checks = []
+            check_data = []
+            for index in range(0, len(frames)):
+                if expected[index] is not None:
+                    checks.append(expected[index])
+                    check_data.append(received[index][1:1 + len(expected[index])])
+
+            failed = result.AddFrames(checks, check_data)
+
+            if logging.getLogger().isEnabledFor(logging.WARNING):
+                for index in numpy.flatnonzero(failed):
+                    logging.warning('Expected %s, got %s', 
+                            checks[index].hex(' '), check_data[index].hex(' '))
+
+        return ExerciseBatch(frames, None, Verify)
+
+    def __BuildFrames(self, offset_data: bytes) -> tuple:
+        '''
+        Builds the frames accessing a register per transaction, 11 frames per
+        iteration
+
+        :param offset_data: Offset register data of every iteration
+        :return: (frames, expected) lists
+        '''
+        frames = []
+        expected = []
+
+        for iters in range(0, ITERATIONS):
             #read DEVID_AD, DEVID_MST and PARTID As a group, then individually
-            test_count += 1
-            msg = [ 0x01, 0x00, 0x00, 0x00, 0x00 ]
-            result = iface.ReadWrite(msg)
-            logging.info('Received %s' % str(result))
-
-            if ((result[1] == FIXED_REG_VALUES[0x00]) and 
-                (result[2] == FIXED_REG_VALUES[0x01]) and 
-                (result[3] == FIXED_REG_VALUES[0x02])):
-                success_count += 1
-            else:
-                logging.warning('Expected 0x%02X 0x%02X 0x%02X, got %s' % 
-                            (FIXED_REG_VALUES[0x00], FIXED_REG_VALUES[0x01],
-                             FIXED_REG_VALUES[0x02], str(result[1:4])))
+            frames.append(bytes((0x01, 0x00, 0x00, 0x00, 0x00)))
+            expected.append(bytes((FIXED_REG_VALUES[0x00], 
+                                   FIXED_REG_VALUES[0x01],
+                                   FIXED_REG_VALUES[0x02])))
 
             # Read the ID registers individual;y
             for reg_addr in FIXED_REG_VALUES:
-                test_count += 1
-                msg = [ (reg_addr << 1) | 0x1, 0x00 ]
-                result = iface.ReadWrite(msg)
-                logging.info('Received %s' % str(result))
-
-                if (result[1] == FIXED_REG_VALUES[reg_addr]):
-                    success_count += 1
-                else:
-                    logging.warning('Expected 0x%02X, got %s' % 
-                            (FIXED_REG_VALUES[reg_addr], str(result[1])))
-
-            #Generate some random data for the Offset Regs add address 0x1E
-            rand_data = list(random.randbytes(6))
-            msg = [0x1E << 1]
-            msg.extend(rand_data) 
-            logging.info('Writing: %s' % str(msg))
-            iface.Write(msg)
+                frames.append(bytes(((reg_addr << 1) | 0x1, 0x00)))
+                expected.append(bytes((FIXED_REG_VALUES[reg_addr],)))
+
+            #Pattern data for the Offset Regs add address 0x1E
+            pattern_data = offset_data[iters * OFFSET_LEN:(iters + 1) * OFFSET_LEN]
+            frames.append(bytes((OFFSET_REG << 1,)) + pattern_data)
+            expected.append(None)
 
             #Read the written data byte by byes
-            for offset in range(0,6):
-                test_count += 1
-                msg = [((0x1E + offset) << 1) | 1, 0x00]
-                result = iface.ReadWrite(msg)
-                logging.info('Received %s' % str(result))
-                if (result[1] == rand_data[offset]):
-                    success_count += 1
-                else:
-                    logging.warning('Expected 0x%02X, got %s' % 
-                            (rand_data[offset], str(result[1])))
-
-        logging.info('%d Tests / %d Success' % (test_count, success_count))
-        return float(success_count) / float(test_count)
\ No newline at end of file
+            for offset in range(0, OFFSET_LEN):
+                frames.append(bytes((((OFFSET_REG + offset) << 1) | 1, 0x00)))
+                expected.append(pattern_data[offset:offset + 1])
+
+        return (frames, expected)
+
+    def __BuildBurstFrames(self, offset_data: bytes) -> tuple:
+        '''
+        Builds the frames accessing whole register windows per transaction,
+        relying on the address auto increment. 3 frames per iteration
+
+        :param offset_data: Offset register data of every iteration
+        :return: (frames, expected) lists
+        '''
+        frames = []
+        expected = []
+
+        for iters in range(0, ITERATIONS):
+            #read DEVID_AD, DEVID_MST and PARTID As a group
+            frames.append(bytes((0x01,)) + bytes(len(FIXED_REG_VALUES)))
+            expected.append(bytes(FIXED_REG_VALUES.values()))
+
+            #Write the offset window, then read it back as a group
+            pattern_data = offset_data[iters * OFFSET_LEN:(iters + 1) * OFFSET_LEN]
+            frames.append(bytes((OFFSET_REG << 1,)) + pattern_data)
+            expected.append(None)
+
+            frames.append(bytes(((OFFSET_REG << 1) | 1,)) + bytes(OFFSET_LEN))
+            expected.append(pattern_data)
+
+        return (frames, expected)
+
+    def __RunStream(self, iface: ISPI, result: ExerciseResult) -> None:
+        '''
+        Reads STATUS through the data registers as a single transaction once
+        per output data rate period. A read without DATA_RDY set returned the
+        previous sample again, as the device flags. Dropped samples are only
+        an estimate from the host's read timing: gaps of more than a period
+        between reads are assumed to let samples go by unread. The device
+        can't count them, as the FIFO buffering every sample overruns long
+        before the stream ends. It is then drained in a single transaction
+        and the axis markers of the samples it holds verified.
+
+        :param iface: ISPI Interface to exercise against
+        :param result: Results to add the stream statistics and FIFO checks to
+        '''
+        #Measure at the selected output data rate
+        iface.Write(bytes((FILTER_REG << 1, ODR_CODES[self.__odr])))
+        iface.Write(bytes((POWER_CTL_REG << 1, 0x00)))
+        result.transfer_count += 2
+
+        read = bytes(((STATUS_REG << 1) | 1,)) + bytes(ZDATA1_REG - STATUS_REG + 1)
+        rx = bytearray(len(read))
+        period = 1.0 / self.__odr
+
+        last = time.perf_counter()
+        next_read = last + period
+        for index in range(0, self.__stream_reads):
+            delay = next_read - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            iface.ReadWrite(read, rx)
+            now = time.perf_counter()
+
+            if Trace.active is not None:
+                Trace.active.Record(read, rx)
+
+            if rx[1] & STATUS_DATA_RDY:
+                result.stream_samples += 1
+            else:
+                result.stream_duplicated += 1
+
+            #Whole periods between reads beyond the first are taken as samples
+            #missed, the host's clock standing in for the device's
+            result.stream_dropped += max(0, int((now - last) / period + 0.5) - 1)
+            last = now
+
+            #Don't try to catch up after a stall, that would only read early
+            next_read = max(next_read + period, now)
+
+        result.stream_reads += self.__stream_reads
+        result.transfer_count += self.__stream_reads
+
+        #Drain the FIFO in one transaction, whole samples only
+        entries = iface.ReadWrite(bytes(((FIFO_ENTRIES_REG << 1) | 1, 0x00)))[1]
+        result.transfer_count += 1
+        entries -= entries % 3
+        if entries > 0:
+            frame = bytes(((FIFO_DATA_REG << 1) | 1,)) + bytes(entries * 3)
+            fifo = iface.ReadWrite(frame, bytearray(len(frame)))
+            result.transfer_count += 1
+
+            if Trace.active is not None:
+                Trace.active.Record(frame, fifo)
+
+            #The flags of every entry: x marker on the first of each sample, 
+            #none empty
+            flags = numpy.frombuffer(fifo, dtype=numpy.uint8)[3::3].reshape(-1, 3)
+            expect = numpy.zeros_like(flags)
+            expect[:, 0] = FIFO_X_MARKER
+            failed = result.AddBlock(expect, flags & (FIFO_X_MARKER | FIFO_EMPTY))
+
+            if logging.getLogger().isEnabledFor(logging.WARNING):
+                for row in numpy.flatnonzero(failed):
+                    logging.warning('FIFO sample %d flags: %s', row, 
+                                    flags[row].tobytes().hex(' '))
+
+        #Back to standby
+        iface.Write(bytes((POWER_CTL_REG << 1, 0x01)))
+        result.transfer_count += 1
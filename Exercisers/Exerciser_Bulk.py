@@ -0,0 +1,134 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import logging
+import numpy
+from IExerciser import IExerciser, ExerciseBatch, ExercisePlan, RunPlan, ReceivedBlock
+from ISPI       import ISPI
+from ExerciseResult import ExerciseResult
+from Patterns import GetPattern
+
+#Frames per batch of the stream
+BATCH_FRAMES = 4
+
+class Exerciser_Bulk(IExerciser):
+    '''
+    Implementation of IExerciser streaming large blocks of data through a 
+    loopback, to check whether the bus sustains data at a given clock.
+    Like Exerciser_Loopback this assumes MISO/MOSI is tied together.
+    '''
+    def __init__(self, mode: int, total_bytes: int = 65536, 
+                 frame_bytes: int = 4096, pattern: str = 'random', 
+                 seed: int = 0) -> None:
+        '''
+        Class constructor.
+
+        :param mode: SPI Mode to use for the exercise
+        :param total_bytes: Bytes streamed per exercise
+        :param frame_bytes: Bytes per frame. spidev limits each message to its
+                            bufsiz module parameter, 4096 by default
+        :param pattern: Test pattern streamed, one of Patterns.PATTERN_NAMES
+        :param seed: Seed of the test pattern
+        '''
+        super().__init__()
+        self.__mode = mode
+        self.__pattern = pattern
+        self.__seed = seed
+        self.__frame_bytes = min(frame_bytes, total_bytes)
+
+        #Round up to whole frames so the data is a single block
+        self.__frame_count = -(-total_bytes // self.__frame_bytes)
+
+    def RunExercise(self, iface: ISPI) -> ExerciseResult:
+        '''
+        Runs the bulk exercise.
+
+        :param iface: ISPI Interface to write over
+        :return: Exercise results
+        '''
+        return RunPlan(iface, self.BuildExercise())
+
+    def BuildExercise(self) -> ExercisePlan:
+        '''
+        Builds the bulk exercise.
+        Streams the test pattern as back to back frames, a batch at a time,
+        and verifies every byte was identically received. Only the transfers
+        themselves are timed for the payload throughput
+
+        :return: Built exercise
+        '''
+        result = ExerciseResult()
+        result.mode = self.__mode
+        result.pattern = self.__pattern
+        result.seed = self.__seed
+
+        pattern = GetPattern(self.__pattern, self.__frame_count * self.__frame_bytes,
+                             self.__seed)
+        xmit = numpy.frombuffer(pattern, dtype=numpy.uint8).reshape(
+            self.__frame_count, self.__frame_bytes)
+        result.payload_bytes = xmit.size
+
+        return ExercisePlan(self.__mode, result, self.__BuildBatches(xmit))
+
+    def __BuildBatches(self, xmit: numpy.ndarray):
+        '''
+        Splits the stream into batches of BATCH_FRAMES frames, so a pipelined
+        run verifies each batch while the next one transfers
+
+        :param xmit: (frames, frame bytes) block of the stream
+        :return: Generator of batches
+        '''
+        for first in range(0, len(xmit), BATCH_FRAMES):
+            yield self.__Batch(first, xmit[first:first + BATCH_FRAMES])
+
+    def __Batch(self, first: int, xmit: numpy.ndarray) -> ExerciseBatch:
+        '''
+        :param first: Index of the batch's first frame in the stream
+        :param xmit: (frames, frame bytes) block of the batch
+        :return: Timed batch sending each row as a frame, received into
+                 buffers from the runner
+        '''
+        def Verify(result: ExerciseResult, rx_frames: list) -> None:
+            received = ReceivedBlock(rx_frames, xmit.shape)
+            failed = result.AddBlock(xmit, received)
+
+            if logging.getLogger().isEnabledFor(logging.WARNING):
+                for row in numpy.flatnonzero(failed):
+                    #Frames are too long to log whole, show the first bad byte
+                    offset = int(numpy.flatnonzero(xmit[row] != received[row])[0])
+                    logging.warning('Frame %d byte %d: Expected 0x%02X, Got 0x%02X', 
+                                    first + row, offset, xmit[row, offset], 
+                                    received[row, offset])
+
+        return ExerciseBatch(list(xmit), None, Verify, timed=True)
@@ -33,10 +33,11 @@
  * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 import logging
-import random
 import numpy
-from IExerciser import IExerciser
+from IExerciser import IExerciser, ExerciseBatch, ExercisePlan, RunPlan, ReceivedBlock
 from ISPI       import ISPI
+from ExerciseResult import ExerciseResult
+from Patterns import GetPattern
 
 class Exerciser_Loopback(IExerciser):
     '''
@@ -44,50 +45,129 @@ class Exerciser_Loopback(IExerciser):
     This assumes MISO/MOSI is tied together, or an endpoint device that is
     repeating the input data in real time.
     '''
-    def __init__(self, mode: int) -> None:
+    def __init__(self, mode: int, iterations: int = 50, 
+                 block: bool = False, pattern: str = 'random', 
+                 seed: int = 0) -> None:
         '''
         Class constructor.
         
         :param mode: SPI Mode to use for the exercises
+        :param iterations: Number of payloads per packet width
+        :param block: Generate and verify each width as a single numpy block
+                      rather than frame by frame
+        :param pattern: Test pattern the payloads are cut from, one of
+                        Patterns.PATTERN_NAMES
+        :param seed: Seed of the test pattern
         '''
         super().__init__()
         self.__mode = mode
+        self.__iterations = iterations
+        self.__block = block
+        self.__pattern = pattern
+        self.__seed = seed
 
-    def RunExercise(self, iface: ISPI) -> float:
+    def RunExercise(self, iface: ISPI) -> ExerciseResult:
         '''
         Runs the loopback exercises.
-        For packet widths of 1-8 bytes, 50 iterations, generates random payloads
-        of data and verifies all transmitted bytes are identially received
 
         :param iface: ISPI Interface to write over
-        :return: Success rate
+        :return: Exercise results
         '''
+        return RunPlan(iface, self.BuildExercise())
 
-        test_count = 0
-        success_count = 0
+    def BuildExercise(self) -> ExercisePlan:
+        '''
+        Builds the loopback exercises.
+        For packet widths of 1-8 bytes, cuts payloads from the test pattern
+        and verifies all transmitted bytes are identially received. Every run
+        sends the same payloads, so failures can be replayed with the seed
+
+        :return: Built exercise
+        '''
+        result = ExerciseResult()
+        result.mode = self.__mode
+        result.pattern = self.__pattern
+        result.seed = self.__seed
+
+        #Payloads of every width, back to back
+        pattern = GetPattern(self.__pattern, 36 * self.__iterations, self.__seed)
+
+        if self.__block:
+            batches = self.__BuildBlocks(pattern)
+        else:
+            batches = self.__BuildFrames(pattern)
 
-        random.seed()
-        iface.SetMode(self.__mode)
+        return ExercisePlan(self.__mode, result, batches)
 
+    def __BuildFrames(self, pattern: bytes) -> list:
+        '''
+        Builds the exercise as a batch per width, slicing each frame 
+        individually
+
+        :param pattern: Test pattern holding the payloads of every width
+        :return: List of batches
+        '''
+        #The frames are views of the pattern, nothing is copied
+        view = memoryview(pattern)
+        batches = []
+        offset = 0
         for width in range(1, 9):      #Do payloads of 1-8 bytes
-            for iters in range(0, 50): #50 Iteractions per width
-                test_count += 1
+            frames = []
+            for iters in range(0, self.__iterations):
+                frames.append(view[offset:offset + width])
+                offset += width
+            batches.append(self.__FrameBatch(frames))
+        return batches
+
+    def __FrameBatch(self, frames: list) -> ExerciseBatch:
+        '''
+        :param frames: Payloads of one width
+        :return: Batch sending and verifying the payloads
+        '''
+        def Verify(result: ExerciseResult, received: list) -> None:
+            failed = result.AddFrames(frames, received)
 
-                #Generate the random payload
-                msg = list(random.randbytes(width))
+            if logging.getLogger().isEnabledFor(logging.WARNING):
+                for index in numpy.flatnonzero(failed):
+                    logging.warning('Expected: %s, Got: %s', 
+                                    frames[index].hex(' '), received[index].hex(' '))
 
-                #No guarantee the data wont be mangled by the SPI interface
-                msg_orig = msg.copy()
-                result = iface.ReadWrite(msg)
+        #The runner provides separate receive buffers, so the payloads are
+        #left untouched
+        return ExerciseBatch(frames, None, Verify)
 
-                logging.info('Wrote %s, Received %s' % (str(msg_orig), str(result)))
+    def __BuildBlocks(self, pattern: bytes):
+        '''
+        Builds the exercise with each width's payloads taken as one
+        (iterations, width) block and verified with a single XOR and
+        reduction, so the host cost barely grows with the iteration count
+
+        :param pattern: Test pattern holding the payloads of every width
+        :return: Generator of batches, one per width, built as they are sent
+        '''
+        data = numpy.frombuffer(pattern, dtype=numpy.uint8)
+        offset = 0
 
-                if (numpy.array([msg_orig]) == numpy.array([result])).all():
-                    success_count += 1
-                    logging.info('Valid Data')
-                else:
-                    logging.warning('Expected: %s, Got: %s' % (str(msg_orig), str(result)))
+        for width in range(1, 9):      #Do payloads of 1-8 bytes
+            size = self.__iterations * width
+            xmit = data[offset:offset + size].reshape(self.__iterations, width)
+            offset += size
+            yield self.__BlockBatch(xmit)
+
+    def __BlockBatch(self, xmit: numpy.ndarray) -> ExerciseBatch:
+        '''
+        :param xmit: (iterations, width) block of payloads
+        :return: Batch sending each row as a frame, received into buffers
+                 from the runner
+        '''
+        def Verify(result: ExerciseResult, rx_frames: list) -> None:
+            received = ReceivedBlock(rx_frames, xmit.shape)
+            failed = result.AddBlock(xmit, received)
 
-        logging.info('%d Tests / %d Success' % (test_count, success_count))
+            if logging.getLogger().isEnabledFor(logging.WARNING):
+                for row in numpy.flatnonzero(failed):
+                    logging.warning('Expected: %s, Got: %s', 
+                                    xmit[row].tobytes().hex(' '), 
+                                    received[row].tobytes().hex(' '))
 
-        return float(success_count) / float(test_count)
+        return ExerciseBatch(list(xmit), None, Verify)
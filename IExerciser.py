@@ -33,18 +33,246 @@
  * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 import abc
-from ISPI import ISPI
+import collections
+import logging
+import time
+import numpy
+from ISPI import ISPI, AllocateFrames
+from AsyncISPI import AsyncISPI
+from ExerciseResult import ExerciseResult
+from Trace import Trace
+
+#A batch of frames sent in one Transfer. rx_frames are the buffers to 
+#receive into, or None for the runner to provide them. verify is a 
+#function(result, rx_frames) checking the received frames into the result,
+#or None for frames which aren't verified. Timed batches add their transfer
+#time to the result's payload_time
+ExerciseBatch = collections.namedtuple('ExerciseBatch', 
+    ['frames', 'rx_frames', 'verify', 'timed'], defaults=(False,))
+
+#A built exercise: the SPI mode to run in, the result the batches are 
+#verified into and the batches in the order they are sent. batches may be
+#any iterable, including a generator building them on demand
+ExercisePlan = collections.namedtuple('ExercisePlan', ['mode', 'result', 'batches'])
+
+def RunPlan(iface: ISPI, plan: ExercisePlan) -> ExerciseResult:
+    '''
+    Sends the batches of a built exercise one after the other, verifying 
+    each as it completes
+
+    :param iface: ISPI Interface to exercise against
+    :param plan: Built exercise
+    :return: The plan's result
+    '''
+    iface.SetMode(plan.mode)
+    result = plan.result
+
+    for batch in plan.batches:
+        rx_frames = batch.rx_frames
+        if rx_frames is None:
+            rx_frames = AllocateFrames(batch.frames)
+
+        start = time.perf_counter()
+        received = iface.Transfer(batch.frames, rx_frames)
+        if batch.timed:
+            result.payload_time += time.perf_counter() - start
+        FinishBatch(result, batch, received)
+
+    logging.info('%d Tests / %d Success', result.test_count, result.success_count)
+    return result
+
+async def RunPlanAsync(iface: AsyncISPI, plan: ExercisePlan, 
+                       depth: int = 2) -> ExerciseResult:
+    '''
+    Sends the batches of a built exercise keeping up to depth batches in
+    flight, so each batch is verified while the following ones transfer
+
+    :param iface: AsyncISPI Interface to exercise against
+    :param plan: Built exercise
+    :param depth: Most batches submitted ahead of the one being verified
+    :return: The plan's result
+    '''
+    import asyncio
+
+    await iface.SetMode(plan.mode)
+    result = plan.result
+
+    async def Send(batch: ExerciseBatch) -> tuple:
+        #Timed batches include any time queued behind the batches ahead
+        rx_frames = batch.rx_frames
+        if rx_frames is None:
+            rx_frames = AllocateFrames(batch.frames)
+
+        start = time.perf_counter()
+        received = await iface.Transfer(batch.frames, rx_frames)
+        return (received, time.perf_counter() - start)
+
+    def Finish(batch: ExerciseBatch, sent: tuple) -> None:
+        (received, elapsed) = sent
+        if batch.timed:
+            result.payload_time += elapsed
+        FinishBatch(result, batch, received)
+
+    in_flight = collections.deque()
+    try:
+        for batch in plan.batches:
+            in_flight.append((batch, asyncio.ensure_future(Send(batch))))
+            if len(in_flight) >= depth:
+                (done, task) = in_flight.popleft()
+                Finish(done, await task)
+
+        while in_flight:
+            (done, task) = in_flight.popleft()
+            Finish(done, await task)
+    finally:
+        for (batch, task) in in_flight:
+            task.cancel()
+
+    logging.info('%d Tests / %d Success', result.test_count, result.success_count)
+    return result
+
+def RunPlansInterleaved(iface: ISPI, plans: list, speeds: list) -> float:
+    '''
+    Sends the batches of several built exercises, each at its own clock,
+    in a single TransferSpeeds call. The plans take turns a batch at a
+    time, so slow drift of the setup is spread evenly across every clock,
+    while each batch's frames stay back to back for exercises relying on
+    device state between them. The batches are verified into their own plan's
+    result once the transfer completes.
+
+    The transfer is timed as a whole, so each result's wall_time and any
+    timed batches' payload_time are its share of the elapsed time by the
+    bit time of its frames at its clock
+
+    :param iface: ISPI Interface to exercise against
+    :param plans: List of built exercises, all in the same SPI mode
+    :param speeds: List of clock speeds in Hz, one per plan
+    :return: Elapsed time of the transfer in seconds
+    '''
+    if len(set(plan.mode for plan in plans)) > 1:
+        raise Exception('Interleaved exercises must all run in the same SPI mode')
+
+    pending = [collections.deque(plan.batches) for plan in plans]
+
+    #(plan index, batch, first frame) in the order they are sent
+    sent = []
+    frames = []
+    frame_speeds = []
+    rx_frames = []
+    while any(pending):
+        for index in range(0, len(plans)):
+            if not pending[index]:
+                continue
+            batch = pending[index].popleft()
+            sent.append((index, batch, len(frames)))
+            frames.extend(batch.frames)
+            frame_speeds.extend([speeds[index]] * len(batch.frames))
+            rx_frames.extend(AllocateFrames(batch.frames) if batch.rx_frames is None
+                             else batch.rx_frames)
+
+    if not frames:
+        return 0.0
+
+    iface.SetMode(plans[0].mode)
+    start = time.perf_counter()
+    received = iface.TransferSpeeds(frames, frame_speeds, rx_frames)
+    elapsed = time.perf_counter() - start
+
+    def BitTime(batch: ExerciseBatch, speed: int) -> float:
+        return sum(len(frame) for frame in batch.frames) * 8.0 / speed
+
+    total_bit_time = sum(BitTime(batch, speeds[index]) for (index, batch, first) in sent)
+    if total_bit_time <= 0.0:
+        total_bit_time = 1.0
+
+    for (index, batch, first) in sent:
+        result = plans[index].result
+        share = elapsed * BitTime(batch, speeds[index]) / total_bit_time
+        result.wall_time += share
+        if batch.timed:
+            result.payload_time += share
+        FinishBatch(result, batch, received[first:first + len(batch.frames)])
+
+    for plan in plans:
+        logging.info('%d Tests / %d Success', plan.result.test_count,
+                     plan.result.success_count)
+    return elapsed
+
+def FinishBatch(result: ExerciseResult, batch: ExerciseBatch, 
+                 received: list) -> None:
+    '''
+    Counts, traces and verifies a transferred batch
+
+    :param result: Result to verify into
+    :param batch: Batch transferred
+    :param received: Received frames of the batch
+    '''
+    result.transfer_count += len(batch.frames)
+
+    if Trace.active is not None:
+        Trace.active.RecordBatch(batch.frames, received)
+
+    if batch.verify is not None:
+        batch.verify(result, received)
+
+def ReceivedBlock(received: list, shape: tuple) -> numpy.ndarray:
+    '''
+    Views the received frames of a batch sent without rx_frames as a single
+    block. The runners receive such batches into consecutive views of one
+    buffer, from AllocateFrames or an engine's pool, so the block is a view
+    of that buffer rather than a copy. The buffer may be reused once the
+    batch is verified, so the block mustn't be kept
+
+    :param received: Received frames of the batch
+    :param shape: Shape of the block, its size the batch's total bytes
+    :return: uint8 block of the received bytes
+    '''
+    block = numpy.frombuffer(memoryview(received[0]).obj, dtype=numpy.uint8)
+    if block.size != numpy.prod(shape):
+        #Not views of a single buffer, e.g. a list of bytes
+        block = numpy.frombuffer(b''.join(received), dtype=numpy.uint8)
+    return block.reshape(shape)
 
 class IExerciser:
     '''
     Interface class for defining exerciser instances
+
+    Exercisers which send their frames as batches known up front can also 
+    implement BuildExercise, splitting the exercise into a build phase and
+    verify phase. RunPlan and RunPlanAsync then run the same plan on either
+    kind of interface
     '''
 
     @abc.abstractclassmethod    
-    def RunExercise(self, iface: ISPI ) -> float:
+    def RunExercise(self, iface: ISPI ) -> ExerciseResult:
         '''
-        Runs the exercise and returns the success rate percentage
+        Runs the exercise and returns the results
         :param iface:  SPI Inteface to run the exeriser
-        :return: Success rate percentage (0.0-1.0)
+        :return: Results of the exercise, including the success rate and bit
+                 error statistics
+        '''
+        pass
+
+    def BuildExercise(self) -> ExercisePlan:
+        '''
+        Builds the frames of the exercise and their verification
+
+        :return: Built exercise, None if the exercise can't be built up front
+        '''
+        return None
+
+    async def RunExerciseAsync(self, iface: AsyncISPI, 
+                               depth: int = 2) -> ExerciseResult:
+        '''
+        Runs the exercise on an AsyncISPI interface. Built exercises keep 
+        up to depth batches in flight, others run the blocking RunExercise
+        on the interface's executor
+
+        :param iface: AsyncISPI Interface to run the exercise on
+        :param depth: Most batches in flight at once
+        :return: Results of the exercise
         '''
-        pass
\ No newline at end of file
+        plan = self.BuildExercise()
+        if plan is None:
+            return await iface.RunBlocking(self.RunExercise)
+        return await RunPlanAsync(iface, plan, depth)
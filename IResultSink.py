@@ -0,0 +1,75 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import abc
+
+#Bus statistics fields of a result record. These are None unless the
+#interface is instrumented
+BUS_STAT_FIELDS = [ 'bytes', 'frames', 'calls', 'bus_time', 'latency_p50_ns', 
+                    'latency_p90_ns', 'latency_p99_ns', 'latency_max_ns', 
+                    'call_latency_p50_ns', 'call_latency_p90_ns', 
+                    'call_latency_p99_ns', 'call_latency_max_ns', 'throughput',
+                    'theoretical_throughput', 'utilization' ]
+
+#Fields of a result record, in the order they are written
+RECORD_FIELDS = [ 'timestamp', 'interface', 'bus', 'cs', 'exerciser', 'mode',
+                  'freq', 'test_count', 'success_count', 'success_rate',
+                  'bit_errors', 'bits_compared', 'ber', 'transfer_count',
+                  'wall_time', 'tps', 'payload_bytes', 'payload_throughput',
+                  'payload_utilization', 'stream_samples', 'stream_duplicated',
+                  'stream_dropped', 'rounds', 'decision', 'cached', 'word_delay',
+                  'pattern', 'seed' ] + BUS_STAT_FIELDS
+
+class IResultSink:
+    '''
+    Interface class for defining result outputs. A record is written for
+    every frequency point as it completes.
+    '''
+
+    @abc.abstractclassmethod
+    def Write(self, record: dict) -> None:
+        '''
+        Writes a result record. Records must be flushed before returning so
+        completed points survive a crash and the output can be followed live
+
+        :param record: Dictionary with a value for each of RECORD_FIELDS
+        '''
+        pass
+
+    @abc.abstractclassmethod
+    def Close(self) -> None:
+        '''
+        Closes the output
+        '''
+        pass
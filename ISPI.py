@@ -34,41 +34,122 @@
 '''
 import abc
 
+def AllocateFrames(frames: list) -> list:
+    '''
+    Allocates receive buffers matching a list of frames. All of the buffers
+    are views into a single bytearray so a batch costs one allocation.
+
+    :param frames: List of frames to size the receive buffers from
+    :return: List of writable memoryviews, same lengths as frames
+    '''
+    block = memoryview(bytearray(sum(len(frame) for frame in frames)))
+    rx_frames = []
+    offset = 0
+    for frame in frames:
+        rx_frames.append(block[offset:offset + len(frame)])
+        offset += len(frame)
+    return rx_frames
+
 class ISPI:
     '''
     Interface class for defining SPI bus connections
+
+    Transmit data may be any buffer-protocol object (bytes, bytearray,
+    memoryview, array.array('B') or numpy uint8 arrays). Received data is
+    returned as a bytes-like object. Where a receive buffer is provided by the
+    caller it is filled in place and returned, so the hot path can run without
+    any per-frame allocations or copies.
     '''
 
     @abc.abstractclassmethod
-    def ReadWrite(self, xmit: list) -> list:
+    def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
         '''
         Performs a SPI Read/Write Transaction
         
-        :param xmit: List of bytes to transmit
-        :return: List of bytes received, will be same length as xmit
+        :param xmit: Bytes to transmit
+        :param rx: Optional writable buffer, same length as xmit, to receive
+                   into
+        :return: Bytes received, will be same length as xmit. This is rx when
+                 it was provided
         '''
         pass
 
     @abc.abstractclassmethod
-    def Read(self, count: int) -> list:
+    def Read(self, count: int, rx: bytearray = None) -> bytes:
         '''
         Performs a SPI Read Only Transaction
         
         :param count: Number of bytes to read
-        :return: List of bytes read
+        :param rx: Optional writable buffer of count bytes to receive into
+        :return: Bytes read. This is rx when it was provided
         '''
         pass
 
     @abc.abstractclassmethod
-    def Write(self, xmit: list) -> int:
+    def Write(self, xmit: bytes) -> int:
         '''
         Performs a SPI Write Only Transaction
         
-        :param xmit: List of bytes to transmit
+        :param xmit: Bytes to transmit
         :return: Number of bytes transmitted
         '''
         pass
 
+    def Transfer(self, frames: list, rx_frames: list = None) -> list:
+        '''
+        Performs a batch of SPI Read/Write Transactions. Chip select is
+        released between each frame.
+
+        The default implementation loops over ReadWrite. Interfaces which can
+        submit several frames in one call to the driver should override this.
+
+        :param frames: List of frames, each a bytes-like object to transmit
+        :param rx_frames: Optional list of writable buffers, one per frame, to
+                          receive into
+        :return: List of received frames, same order and lengths as frames.
+                 This is rx_frames when it was provided
+        '''
+        if rx_frames is None:
+            return [self.ReadWrite(frame) for frame in frames]
+
+        for frame, rx in zip(frames, rx_frames):
+            self.ReadWrite(frame, rx)
+        return rx_frames
+
+    def TransferSpeeds(self, frames: list, speeds: list,
+                       rx_frames: list = None) -> list:
+        '''
+        Performs a batch of SPI Read/Write Transactions, each frame clocked at
+        its own speed. Chip select is released between each frame.
+
+        The default implementation sets the speed and calls Transfer for each
+        run of frames at the same speed, leaving the bus at the speed of the
+        last frame, so callers set the speed again before their next
+        Transfer. Interfaces which can set the clock per frame in one call
+        to the driver should override this.
+
+        :param frames: List of frames, each a bytes-like object to transmit
+        :param speeds: List of clock speeds in Hz, one per frame
+        :param rx_frames: Optional list of writable buffers, one per frame, to
+                          receive into
+        :return: List of received frames, same order and lengths as frames.
+                 This is rx_frames when it was provided
+        '''
+        if rx_frames is None:
+            rx_frames = AllocateFrames(frames)
+
+        start = 0
+        while start < len(frames):
+            end = start + 1
+            while (end < len(frames)) and (speeds[end] == speeds[start]):
+                end += 1
+
+            self.SetSpeed(speeds[start])
+            rx_frames[start:end] = self.Transfer(frames[start:end], rx_frames[start:end])
+            start = end
+
+        return rx_frames
+
     @abc.abstractclassmethod
     def Cleanup(self) -> None:
         '''
@@ -92,4 +173,14 @@ class ISPI:
 
         :param speed: Clock speed in Hz
         '''
-        pass
\ No newline at end of file
+        pass
+
+    def SetWordDelay(self, usecs: int) -> None:
+        '''
+        Sets a delay between the bytes of each frame. Interfaces which can't
+        delay between bytes only accept 0
+
+        :param usecs: Delay in microseconds
+        '''
+        if usecs != 0:
+            raise Exception('Word delay is not supported by this interface')
\ No newline at end of file
@@ -79,20 +79,60 @@ class SPI_aardvark(ISPI):
         #Make sure it is in SPI mode
         aa.aa_configure(self.__aardvark_handle, aa.AA_CONFIG_SPI_I2C)
 
+        #Preallocated transfer arrays, keyed by length. Frame lengths repeat,
+        #so this avoids allocating arrays on every transaction
+        self.__tx_arrays = {}
+        self.__rx_arrays = {}
+        self.__zero_arrays = {}
 
-    def ReadWrite(self, xmit: list) -> list:
-        #The Aardvard API uses arrays, so convert between lists and arrays here
-        xmit_array = array.array('B', xmit)
-        return_array = aa.array_u08(len(xmit))
-        aa.aa_spi_write(self.__aardvark_handle, xmit_array, return_array )
-        return return_array.tolist()
 
-    def Read(self, count: int) -> list:
-        xmit = [0]*count
-        return self.ReadWrite(xmit)
+    @staticmethod
+    def FindDongles() -> list:
+        '''
+        Lists the attached Aardvark dongles
+
+        :return: List of the unique IDs of all attached dongles
+        '''
+        global aa
+        import aardvark_py as aa
+
+        (num, ports, unique_ids) = aa.aa_find_devices_ext(16, 16)
+        return list(unique_ids)
+
+    def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
+        length = len(xmit)
+
+        #The Aardvark API uses array('B'), pass those straight through and
+        #copy anything else into a preallocated array
+        if isinstance(xmit, array.array) and xmit.typecode == 'B':
+            xmit_array = xmit
+        else:
+            xmit_array = self.__GetArray(self.__tx_arrays, length)
+            try:
+                memoryview(xmit_array)[:] = memoryview(xmit).cast('B')
+            except TypeError:
+                #Not a buffer (i.e. a list), so build the array from it
+                xmit_array = array.array('B', xmit)
+
+        if isinstance(rx, array.array) and rx.typecode == 'B':
+            aa.aa_spi_write(self.__aardvark_handle, xmit_array, rx)
+            return rx
+
+        return_array = self.__GetArray(self.__rx_arrays, length)
+        aa.aa_spi_write(self.__aardvark_handle, xmit_array, return_array)
+
+        if rx is None:
+            return bytes(return_array)
+        memoryview(rx)[:] = memoryview(return_array)
+        return rx
+
+    def Read(self, count: int, rx: bytearray = None) -> bytes:
+        #Transmit zeros from arrays that are never written to
+        return self.ReadWrite(self.__GetArray(self.__zero_arrays, count), rx)
 
-    def Write(self, xmit: list) -> int:
-        return len(self.ReadWrite(xmit))
+    def Write(self, xmit: bytes) -> int:
+        return len(self.ReadWrite(xmit, self.__GetArray(self.__rx_arrays,
+                                                        len(xmit))))
 
     def SetMode(self, mode: int) -> None:
         if mode == 0:
@@ -109,4 +149,20 @@ class SPI_aardvark(ISPI):
         aa.aa_spi_bitrate(self.__aardvark_handle, int(speed / 1000))        
 
     def Cleanup(self) -> None:
-        aa.aa_close(self.__aardvark_handle)
\ No newline at end of file
+        aa.aa_close(self.__aardvark_handle)
+
+    def __GetArray(self, cache: dict, length: int) -> array.array:
+        '''
+        Gets the preallocated array of the given length, creating it on first
+        use
+
+        :param cache: Dictionary of arrays keyed by length
+        :param length: Length of the array
+        :return: array('B') of length bytes
+        '''
+        buf = cache.get(length)
+        #The API may trim the array on a short transfer, so check the length
+        if (buf is None) or (len(buf) != length):
+            buf = aa.array_u08(length)
+            cache[length] = buf
+        return buf
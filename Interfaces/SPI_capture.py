@@ -0,0 +1,122 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+from ISPI import ISPI
+from CaptureLog import CaptureWriter
+
+class SPI_capture(ISPI):
+    '''
+    Implementation of the ISPI interface class which wraps another interface
+    and appends every transaction to a capture log, along with the clock
+    frequency, mode, bus and chip select it ran at. The log can be read back
+    with CaptureReader or replayed against an exerciser with SPI_replay.
+    '''
+
+    def __init__(self, iface: ISPI, writer: CaptureWriter, 
+                 bus: int, cs: int) -> None:
+        '''
+        Class constructor.
+
+        :param iface: Interface to wrap
+        :param writer: Log to capture to
+        :param bus: Bus number recorded with each transaction
+        :param cs: Chip select number recorded with each transaction
+        '''
+        super().__init__()
+        self.__iface = iface
+        self.__writer = writer
+        self.__bus = bus
+        self.__cs = cs
+        self.__speed = None
+        self.__mode = None
+
+    def Wrapped(self) -> ISPI:
+        '''
+        :return: The interface being captured
+        '''
+        return self.__iface
+
+    def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
+        received = self.__iface.ReadWrite(xmit, rx)
+        self.__writer.Write(self.__speed, self.__mode, self.__bus, self.__cs, 
+                            xmit, received)
+        return received
+
+    def Read(self, count: int, rx: bytearray = None) -> bytes:
+        received = self.__iface.Read(count, rx)
+        self.__writer.Write(self.__speed, self.__mode, self.__bus, self.__cs, 
+                            None, received)
+        return received
+
+    def Write(self, xmit: bytes) -> int:
+        count = self.__iface.Write(xmit)
+        self.__writer.Write(self.__speed, self.__mode, self.__bus, self.__cs, 
+                            xmit, None)
+        return count
+
+    def Transfer(self, frames: list, rx_frames: list = None) -> list:
+        received = self.__iface.Transfer(frames, rx_frames)
+        self.__writer.WriteBatch(self.__speed, self.__mode, self.__bus, self.__cs,
+                                 frames, received)
+        return received
+
+    def TransferSpeeds(self, frames: list, speeds: list,
+                       rx_frames: list = None) -> list:
+        received = self.__iface.TransferSpeeds(frames, speeds, rx_frames)
+
+        #Each run of frames at the same speed is recorded at its own clock
+        start = 0
+        while start < len(frames):
+            end = start + 1
+            while (end < len(frames)) and (speeds[end] == speeds[start]):
+                end += 1
+            self.__writer.WriteBatch(speeds[start], self.__mode, self.__bus, 
+                                     self.__cs, frames[start:end], received[start:end])
+            start = end
+
+        return received
+
+    def Cleanup(self) -> None:
+        self.__iface.Cleanup()
+
+    def SetMode(self, mode: int) -> None:
+        self.__iface.SetMode(mode)
+        self.__mode = mode
+
+    def SetSpeed(self, speed: int) -> None:
+        self.__iface.SetSpeed(speed)
+        self.__speed = speed
+
+    def SetWordDelay(self, usecs: int) -> None:
+        self.__iface.SetWordDelay(usecs)
@@ -0,0 +1,115 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import asyncio
+import concurrent.futures
+from AsyncISPI import AsyncISPI
+from ISPI import ISPI
+
+class SPI_executor(AsyncISPI):
+    '''
+    Implementation of the AsyncISPI interface class which adapts a blocking
+    ISPI interface, such as SPI_spidev or SPI_aardvark, by running its calls
+    in an executor. 
+
+    By default each adapter has its own single worker thread, so the calls
+    to one bus run in the order they were awaited and never overlap while
+    separate buses run in parallel. The spidev ioctls and Aardvark library
+    calls release the GIL, leaving the event loop free to verify results
+    and serve other targets meanwhile.
+    '''
+
+    def __init__(self, iface: ISPI, 
+                 executor: concurrent.futures.Executor = None) -> None:
+        '''
+        Class constructor.
+
+        :param iface: Blocking interface to adapt
+        :param executor: Optional executor to run the calls in. Calls to
+                         the interface must not overlap, so it should have a
+                         single worker
+        '''
+        super().__init__()
+        self.__iface = iface
+        self.__own_executor = executor is None
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.__executor = executor
+
+    def Blocking(self) -> ISPI:
+        '''
+        :return: The blocking interface underneath
+        '''
+        return self.__iface
+
+    async def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
+        return await self.__Call(self.__iface.ReadWrite, xmit, rx)
+
+    async def Read(self, count: int, rx: bytearray = None) -> bytes:
+        return await self.__Call(self.__iface.Read, count, rx)
+
+    async def Write(self, xmit: bytes) -> int:
+        return await self.__Call(self.__iface.Write, xmit)
+
+    async def Transfer(self, frames: list, rx_frames: list = None) -> list:
+        #A whole batch per executor hop
+        return await self.__Call(self.__iface.Transfer, frames, rx_frames)
+
+    async def RunBlocking(self, function):
+        return await self.__Call(function, self.__iface)
+
+    async def Cleanup(self) -> None:
+        await self.__Call(self.__iface.Cleanup)
+        if self.__own_executor:
+            self.__executor.shutdown(wait=False)
+
+    async def SetMode(self, mode: int) -> None:
+        await self.__Call(self.__iface.SetMode, mode)
+
+    async def SetSpeed(self, speed: int) -> None:
+        await self.__Call(self.__iface.SetSpeed, speed)
+
+    async def SetWordDelay(self, usecs: int) -> None:
+        await self.__Call(self.__iface.SetWordDelay, usecs)
+
+    async def __Call(self, function, *args):
+        '''
+        Runs a blocking call in the executor
+
+        :param function: Function to call
+        :param args: Arguments of the call
+        :return: Return value of the call
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, function, *args)
@@ -0,0 +1,199 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import time
+from ISPI import ISPI
+from LatencyHistogram import LatencyHistogram
+
+class SPI_instrumented(ISPI):
+    '''
+    Implementation of the ISPI interface class which wraps another interface
+    and measures it. Every call is timed with perf_counter_ns into a fixed
+    size histogram and the bytes moved are counted, so the achieved
+    throughput can be compared with the theoretical bit time at the
+    configured clock. Recording is a few integer operations per call, low
+    enough to leave on.
+    '''
+
+    def __init__(self, iface: ISPI) -> None:
+        '''
+        Class constructor.
+
+        :param iface: Interface to wrap
+        '''
+        super().__init__()
+        self.__iface = iface
+        self.__speed = 0
+        #Latency of each frame, a batch recording its mean once per frame,
+        #and of each call as a whole
+        self.__latency = LatencyHistogram()
+        self.__call_latency = LatencyHistogram()
+        self.__bytes = 0
+        self.__frames = 0
+        self.__bus_time = 0
+        #Time the bytes moved take at the clock they ran at, in ns
+        self.__bit_time = 0.0
+
+    def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
+        start = time.perf_counter_ns()
+        received = self.__iface.ReadWrite(xmit, rx)
+        self.__Record(time.perf_counter_ns() - start, 1, len(xmit), 
+                      self.__BitTime(len(xmit), self.__speed))
+        return received
+
+    def Read(self, count: int, rx: bytearray = None) -> bytes:
+        start = time.perf_counter_ns()
+        received = self.__iface.Read(count, rx)
+        self.__Record(time.perf_counter_ns() - start, 1, count, 
+                      self.__BitTime(count, self.__speed))
+        return received
+
+    def Write(self, xmit: bytes) -> int:
+        start = time.perf_counter_ns()
+        count = self.__iface.Write(xmit)
+        self.__Record(time.perf_counter_ns() - start, 1, len(xmit), 
+                      self.__BitTime(len(xmit), self.__speed))
+        return count
+
+    def Transfer(self, frames: list, rx_frames: list = None) -> list:
+        start = time.perf_counter_ns()
+        received = self.__iface.Transfer(frames, rx_frames)
+        duration = time.perf_counter_ns() - start
+        count = sum(len(frame) for frame in frames)
+        self.__Record(duration, len(frames), count, self.__BitTime(count, self.__speed))
+        return received
+
+    def TransferSpeeds(self, frames: list, speeds: list,
+                       rx_frames: list = None) -> list:
+        start = time.perf_counter_ns()
+        received = self.__iface.TransferSpeeds(frames, speeds, rx_frames)
+        duration = time.perf_counter_ns() - start
+
+        #Each frame's bit time is at its own clock
+        bit_time = sum(self.__BitTime(len(frame), speed) 
+                       for frame, speed in zip(frames, speeds))
+        self.__Record(duration, len(frames), sum(len(frame) for frame in frames),
+                      bit_time)
+
+        #The bus is left at the last frame's speed, see ISPI.TransferSpeeds
+        if speeds:
+            self.__speed = speeds[-1]
+        return received
+
+    def SetMode(self, mode: int) -> None:
+        self.__iface.SetMode(mode)
+
+    def SetSpeed(self, speed: int) -> None:
+        self.__speed = speed
+        self.__iface.SetSpeed(speed)
+
+    def SetWordDelay(self, usecs: int) -> None:
+        self.__iface.SetWordDelay(usecs)
+
+    def Cleanup(self) -> None:
+        self.__iface.Cleanup()
+
+    def Stats(self) -> dict:
+        '''
+        Gets the statistics recorded since the last reset
+
+        :return: Dictionary of bytes moved, frames, calls, bus_time (s), per
+                 frame and per call latency percentiles (ns), achieved and
+                 theoretical throughput (bytes/s) and utilization 
+                 (achieved/theoretical). Frames within a batch each count
+                 as the batch's mean latency
+        '''
+        bus_time = self.__bus_time / 1e9
+        throughput = (self.__bytes / bus_time) if bus_time > 0 else 0.0
+        if self.__bit_time > 0:
+            theoretical = self.__bytes / (self.__bit_time / 1e9)
+        else:
+            theoretical = self.__speed / 8.0
+        return { 'bytes': self.__bytes,
+                 'frames': self.__frames,
+                 'calls': self.__call_latency.count,
+                 'bus_time': bus_time,
+                 'latency_p50_ns': self.__latency.Percentile(50),
+                 'latency_p90_ns': self.__latency.Percentile(90),
+                 'latency_p99_ns': self.__latency.Percentile(99),
+                 'latency_max_ns': self.__latency.max,
+                 'call_latency_p50_ns': self.__call_latency.Percentile(50),
+                 'call_latency_p90_ns': self.__call_latency.Percentile(90),
+                 'call_latency_p99_ns': self.__call_latency.Percentile(99),
+                 'call_latency_max_ns': self.__call_latency.max,
+                 'throughput': throughput,
+                 'theoretical_throughput': theoretical,
+                 'utilization': (throughput / theoretical) if theoretical > 0 else 0.0 }
+
+    def Reset(self) -> None:
+        '''
+        Clears the recorded statistics, i.e. at the start of each frequency
+        point
+        '''
+        self.__latency.Reset()
+        self.__call_latency.Reset()
+        self.__bytes = 0
+        self.__frames = 0
+        self.__bus_time = 0
+        self.__bit_time = 0.0
+
+    def __Record(self, duration: int, frames: int, count: int, 
+                 bit_time: float) -> None:
+        '''
+        Records a call
+
+        :param duration: Call duration in ns
+        :param frames: Number of frames in the call
+        :param count: Number of bytes moved
+        :param bit_time: Time the bytes take at their clock in ns
+        '''
+        self.__call_latency.Record(duration)
+        #Every frame of a batch is recorded, at the batch's mean latency
+        if frames > 0:
+            self.__latency.Record(duration // frames, frames)
+        self.__bytes += count
+        self.__frames += frames
+        self.__bus_time += duration
+        self.__bit_time += bit_time
+
+    @staticmethod
+    def __BitTime(count: int, speed: int) -> float:
+        '''
+        :param count: Number of bytes
+        :param speed: Clock speed in Hz, 0 if not set
+        :return: Time the bytes take on the bus in ns, 0 if the speed isn't set
+        '''
+        if speed <= 0:
+            return 0.0
+        return count * 8e9 / speed
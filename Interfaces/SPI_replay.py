@@ -0,0 +1,138 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+from ISPI import ISPI
+from CaptureLog import CaptureReader
+
+class SPI_replay(ISPI):
+    '''
+    Implementation of the ISPI interface class which plays a capture log
+    back. Each transaction is answered with the next captured response of
+    the bus and chip select, copied straight out of the mapped log, so
+    exercisers run offline at CPU speed against what the hardware returned.
+
+    The exerciser has to send what was captured, at the same clock and
+    mode. Replay stops with an exception where it diverges, as the captured
+    responses no longer apply from there on.
+    '''
+
+    def __init__(self, path: str, bus: int = None, cs: int = None) -> None:
+        '''
+        Class constructor.
+
+        :param path: Capture log file
+        :param bus: Bus number to replay, None for every bus
+        :param cs: Chip select number to replay, None for every chip select
+        '''
+        super().__init__()
+        self.__reader = CaptureReader(path)
+        self.__records = self.__reader.Records(bus, cs)
+        self.__index = 0
+        self.__speed = None
+        self.__mode = None
+
+    def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
+        record = self.__Next(xmit)
+        return self.__Receive(record, len(xmit), rx)
+
+    def Read(self, count: int, rx: bytearray = None) -> bytes:
+        record = self.__Next(None)
+        return self.__Receive(record, count, rx)
+
+    def Write(self, xmit: bytes) -> int:
+        record = self.__Next(xmit)
+        if record.rx is not None:
+            self.__Diverged('a read/write transaction was captured, not a write')
+        return len(xmit)
+
+    def Cleanup(self) -> None:
+        #The generator holds views into the map until closed
+        self.__records.close()
+        self.__reader.Close()
+
+    def SetMode(self, mode: int) -> None:
+        self.__mode = mode
+
+    def SetSpeed(self, speed: int) -> None:
+        self.__speed = speed
+
+    def SetWordDelay(self, usecs: int) -> None:
+        pass
+
+    def __Next(self, xmit: bytes):
+        '''
+        Takes the next captured transaction, checking it matches this one
+
+        :param xmit: Bytes transmitted, None for a read only transaction
+        :return: CaptureRecord
+        '''
+        record = next(self.__records, None)
+        self.__index += 1
+        if record is None:
+            self.__Diverged('the capture has no more transactions')
+
+        if (record.freq != self.__speed) or (record.mode != self.__mode):
+            self.__Diverged('captured at %d Hz mode %s, replayed at %s Hz mode %s' % 
+                            (record.freq, record.mode, self.__speed, self.__mode))
+        if xmit is None:
+            if record.tx is not None:
+                self.__Diverged('a transmitting transaction was captured, not a read')
+        elif (record.tx is None) or (record.tx != memoryview(xmit).cast('B')):
+            self.__Diverged('transmitted %s, captured %s' % 
+                            (bytes(xmit).hex(' '), 
+                             'a read' if record.tx is None else record.tx.hex(' ')))
+        return record
+
+    def __Receive(self, record, count: int, rx: bytearray) -> bytes:
+        '''
+        :param record: Captured transaction
+        :param count: Number of bytes received
+        :param rx: Optional writable buffer to receive into
+        :return: The captured received bytes, in rx when it was provided
+        '''
+        if record.rx is None:
+            self.__Diverged('a write only transaction was captured')
+        if rx is None:
+            return bytes(record.rx)
+        rx[:count] = record.rx
+        return rx
+
+    def __Diverged(self, reason: str) -> None:
+        '''
+        Stops the replay where it no longer follows the capture
+
+        :param reason: How the transaction differs
+        '''
+        raise Exception('Replay diverged from the capture at transaction %d: %s' % 
+                        (self.__index, reason))
@@ -0,0 +1,385 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import collections
+import math
+import random
+import time
+from ISPI import ISPI
+
+#Devices which can be emulated on the far end of the simulated bus
+SIM_DEVICES = ('loopback', 'ad5592r', 'adxl355')
+
+#Fault types injected into received frames
+FAULT_BIT_ERROR    = 0
+FAULT_DROPPED_BYTE = 1
+FAULT_SHIFTED_BIT  = 2
+
+class _LoopbackModel:
+    '''
+    MISO tied to MOSI, every byte is echoed back in the same frame
+    '''
+    #Loopback works in any SPI mode
+    MODE = None
+
+    def Exchange(self, xmit: memoryview, rx: memoryview) -> None:
+        rx[:] = xmit
+
+class _AD5592rModel:
+    '''
+    AD5592r control register file. Register writes are 16 bit frames with
+    bit 15 clear, address in bits 14:11 and data in bits 10:0. A readback
+    enable write to register 7 clocks the selected register out on the next
+    frame.
+    '''
+    MODE = 1
+
+    def __init__(self) -> None:
+        self.__regs = [0] * 16
+        self.__pending = 0
+
+    def Exchange(self, xmit: memoryview, rx: memoryview) -> None:
+        #Clock out the word queued by the previous frame
+        out = self.__pending
+        self.__pending = 0
+        rx[:] = bytes(len(rx))
+        if len(rx) >= 2:
+            rx[0] = (out >> 8) & 0xFF
+            rx[1] = out & 0xFF
+
+        if len(xmit) < 2:
+            return
+
+        cmd = (xmit[0] << 8) | xmit[1]
+        if cmd & 0x8000:
+            #DAC writes don't touch the register file
+            return
+
+        addr = (cmd >> 11) & 0xF
+        data = cmd & 0x7FF
+        if addr == 0x0:
+            #NOP
+            return
+        elif addr == 0x7 and (data & 0x40):
+            #Readback enable, bits 5:2 select the register
+            reg = (data >> 2) & 0xF
+            self.__pending = (reg << 11) | self.__regs[reg]
+        elif addr == 0xF and data == 0x5AC:
+            #Software reset
+            self.__regs = [0] * 16
+        else:
+            self.__regs[addr] = data
+
+class _ADXL355Model:
+    '''
+    ADXL355 register map. Frames start with an address byte, bits 7:1 the
+    register address and bit 0 set for reads. Multi-byte accesses auto
+    increment the address, except reads starting at FIFO_DATA which pop
+    FIFO entries. In measurement mode a sample is produced every output data
+    rate period, with the x axis holding a sample counter.
+    '''
+    MODE = 0
+
+    #Power on values of the registers which are not 0
+    RESET_VALUES = { 0x00: 0xAD, 0x01: 0x1D, 0x02: 0xED, 0x03: 0x01,
+                     0x29: 0x60, 0x2C: 0x81, 0x2D: 0x01 }
+
+    #Registers which accept writes
+    WRITABLE = range(0x1E, 0x2F)
+
+    #Writing this value to the reset register restores the power on state
+    RESET_CODE = 0x52
+
+    #Measurement registers
+    STATUS       = 0x04
+    FIFO_ENTRIES = 0x05
+    XDATA3       = 0x08
+    FIFO_DATA    = 0x11
+    FILTER       = 0x28
+    POWER_CTL    = 0x2D
+
+    #STATUS bits
+    DATA_RDY = 0x01
+    FIFO_FULL = 0x02
+    FIFO_OVR = 0x04
+
+    #FIFO entry flags, in the last byte of the entry
+    FIFO_X_MARKER = 0x01
+    FIFO_EMPTY = 0x02
+
+    #FIFO depth in entries, 3 entries per sample
+    FIFO_DEPTH = 96
+
+    def __init__(self) -> None:
+        self.__Reset()
+
+    def Exchange(self, xmit: memoryview, rx: memoryview) -> None:
+        length = len(xmit)
+        addr = xmit[0] >> 1
+        rx[0] = 0
+
+        if self.__measure_start is not None:
+            self.__Update()
+
+        if xmit[0] & 0x1:
+            if addr == self.FIFO_DATA:
+                rx[1:] = self.__ReadFifo(length - 1)
+                return
+
+            data = self.__regs[addr:addr + length - 1]
+            rx[1:] = data + bytes(length - 1 - len(data))
+
+            #Status flags clear once read
+            if addr <= self.STATUS < addr + length - 1:
+                self.__regs[self.STATUS] &= ~(self.DATA_RDY | self.FIFO_OVR)
+            return
+
+        rx[1:] = bytes(length - 1)
+        for i in range(1, length):
+            reg = addr + i - 1
+            if reg in self.WRITABLE:
+                self.__regs[reg] = xmit[i]
+                if reg == self.POWER_CTL:
+                    self.__SetPower(xmit[i])
+            elif reg == 0x2F and xmit[i] == self.RESET_CODE:
+                self.__Reset()
+
+    def __Reset(self) -> None:
+        self.__regs = bytearray(0x100)
+        for reg, value in self.RESET_VALUES.items():
+            self.__regs[reg] = value
+        self.__fifo = collections.deque()
+        self.__measure_start = None
+        self.__sample_count = 0
+
+    def __SetPower(self, value: int) -> None:
+        '''
+        Starts or stops measurement on a POWER_CTL write
+
+        :param value: Value written, bit 0 set for standby
+        '''
+        if value & 0x1:
+            self.__measure_start = None
+        elif self.__measure_start is None:
+            self.__measure_start = time.perf_counter()
+            self.__sample_count = 0
+            self.__fifo.clear()
+
+    def __Update(self) -> None:
+        '''
+        Produces the samples due since measurement started
+        '''
+        #ODR is 4000 Hz halved for each step of the FILTER ODR_LPF field
+        odr = 4000.0 / (1 << min(self.__regs[self.FILTER] & 0xF, 10))
+        due = int((time.perf_counter() - self.__measure_start) * odr)
+
+        if due - self.__sample_count > self.FIFO_DEPTH // 3:
+            #Only the newest samples fit, the rest are lost
+            self.__regs[self.STATUS] |= self.FIFO_OVR
+            self.__sample_count = due - self.FIFO_DEPTH // 3
+
+        while self.__sample_count < due:
+            #20 bit left justified axis data, the x axis is a counter
+            x = (self.__sample_count & 0xFFFFF) << 4
+            sample = x.to_bytes(3, 'big') + bytes(3) + bytes(3)
+            self.__regs[self.XDATA3:self.XDATA3 + 9] = sample
+
+            for axis in range(0, 3):
+                if len(self.__fifo) == self.FIFO_DEPTH:
+                    self.__fifo.popleft()
+                    self.__regs[self.STATUS] |= self.FIFO_OVR
+                entry = bytearray(sample[axis * 3:axis * 3 + 3])
+                if axis == 0:
+                    entry[2] |= self.FIFO_X_MARKER
+                self.__fifo.append(bytes(entry))
+
+            self.__regs[self.STATUS] |= self.DATA_RDY
+            self.__sample_count += 1
+
+        self.__regs[self.FIFO_ENTRIES] = len(self.__fifo)
+        if len(self.__fifo) >= self.__regs[0x29]:
+            self.__regs[self.STATUS] |= self.FIFO_FULL
+        else:
+            self.__regs[self.STATUS] &= ~self.FIFO_FULL
+
+    def __ReadFifo(self, count: int) -> bytes:
+        '''
+        Pops FIFO entries, reads past the end return empty entries
+
+        :param count: Bytes to read
+        :return: FIFO data
+        '''
+        data = bytearray()
+        while len(data) < count:
+            if self.__fifo:
+                data += self.__fifo.popleft()
+            else:
+                data += bytes((0, 0, self.FIFO_EMPTY))
+        self.__regs[self.FIFO_ENTRIES] = len(self.__fifo)
+        return bytes(data[:count])
+
+class SPI_sim(ISPI):
+    '''
+    Implementation of the ISPI interface class with an in-process simulated
+    bus and device. Faults are injected into received frames with a
+    probability which rises once the clock passes a cutoff frequency, so the
+    exercisers and sweeps can be run and benchmarked without hardware.
+    '''
+
+    def __init__(self, device: str = 'loopback', cutoff_hz: int = 1000000,
+                 rolloff_hz: int = None, seed: int = None) -> None:
+        '''
+        Class constructor. Creates the simulated device
+
+        :param device: Device to emulate, one of SIM_DEVICES
+        :param cutoff_hz: Clock frequency above which faults start to occur
+        :param rolloff_hz: How quickly faults rise above the cutoff. The per
+                           byte fault probability reaches 63% at cutoff_hz +
+                           rolloff_hz. Defaults to 10% of cutoff_hz
+        :param seed: Optional seed for the fault generator
+        '''
+        super().__init__()
+
+        if device == 'loopback':
+            self.__device = _LoopbackModel()
+        elif device == 'ad5592r':
+            self.__device = _AD5592rModel()
+        elif device == 'adxl355':
+            self.__device = _ADXL355Model()
+        else:
+            raise Exception('Unknown simulated device: ' + str(device))
+
+        self.__cutoff = cutoff_hz
+        self.__rolloff = rolloff_hz if rolloff_hz else max(cutoff_hz / 10, 1)
+        self.__rng = random.Random(seed)
+        self.__mode = 0
+        self.__speed = 0
+        self.__byte_fault_prob = 0.0
+        #Per frame fault probability, cached by frame length
+        self.__frame_fault_prob = {}
+
+    def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
+        return self.Transfer([xmit], None if rx is None else [rx])[0]
+
+    def Read(self, count: int, rx: bytearray = None) -> bytes:
+        return self.ReadWrite(bytes(count), rx)
+
+    def Write(self, xmit: bytes) -> int:
+        self.ReadWrite(xmit)
+        return len(xmit)
+
+    def Transfer(self, frames: list, rx_frames: list = None) -> list:
+        if rx_frames is None:
+            rx_frames = [bytearray(len(frame)) for frame in frames]
+
+        exchange = self.__device.Exchange
+
+        if self.__byte_fault_prob == 0.0:
+            #Fast path, the bus is clean
+            for xmit, rx in zip(frames, rx_frames):
+                exchange(memoryview(xmit), memoryview(rx))
+            return rx_frames
+
+        rand = self.__rng.random
+        for xmit, rx in zip(frames, rx_frames):
+            rx_view = memoryview(rx)
+            exchange(memoryview(xmit), rx_view)
+            if rand() < self.__FrameFaultProbability(len(rx_view)):
+                self.__InjectFault(rx_view)
+
+        return rx_frames
+
+    def SetMode(self, mode: int) -> None:
+        self.__mode = mode
+        self.__UpdateFaultProbability()
+
+    def SetSpeed(self, speed: int) -> None:
+        self.__speed = speed
+        self.__UpdateFaultProbability()
+
+    def SetWordDelay(self, usecs: int) -> None:
+        #Delays between bytes don't change the simulated bit timing
+        pass
+
+    def Cleanup(self) -> None:
+        pass
+
+    def __UpdateFaultProbability(self) -> None:
+        '''
+        Recomputes the per byte fault probability for the current clock
+        '''
+        if (self.__device.MODE is not None) and (self.__mode != self.__device.MODE):
+            #Sampling on the wrong edge corrupts everything
+            self.__byte_fault_prob = 1.0
+        elif self.__speed <= self.__cutoff:
+            self.__byte_fault_prob = 0.0
+        else:
+            self.__byte_fault_prob = 1.0 - math.exp(
+                -(self.__speed - self.__cutoff) / self.__rolloff)
+        self.__frame_fault_prob = {}
+
+    def __FrameFaultProbability(self, length: int) -> float:
+        '''
+        Gets the probability of a fault somewhere in a frame
+
+        :param length: Frame length in bytes
+        :return: Fault probability (0.0-1.0)
+        '''
+        prob = self.__frame_fault_prob.get(length)
+        if prob is None:
+            prob = 1.0 - (1.0 - self.__byte_fault_prob) ** length
+            self.__frame_fault_prob[length] = prob
+        return prob
+
+    def __InjectFault(self, rx: memoryview) -> None:
+        '''
+        Corrupts a received frame in place with a random fault type
+
+        :param rx: Received frame
+        '''
+        length = len(rx)
+        if length == 0:
+            return
+
+        fault = self.__rng.randrange(3)
+        if fault == FAULT_BIT_ERROR:
+            rx[self.__rng.randrange(length)] ^= 1 << self.__rng.randrange(8)
+        elif fault == FAULT_DROPPED_BYTE:
+            #Everything after the dropped byte arrives one byte early
+            index = self.__rng.randrange(length)
+            rx[index:] = bytes(rx[index + 1:]) + b'\xFF'
+        else:
+            #Late sampling shifts the whole frame right by one bit
+            value = int.from_bytes(rx, 'big') >> 1
+            rx[:] = value.to_bytes(length, 'big')
@@ -32,8 +32,86 @@
  * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
  * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
+import ctypes
+import fcntl
+import numpy
 from ISPI import ISPI
 
+class _SpiIocTransfer(ctypes.Structure):
+    '''
+    Mirror of struct spi_ioc_transfer from <linux/spi/spidev.h>
+    '''
+    _fields_ = [ ('tx_buf',           ctypes.c_uint64),
+                 ('rx_buf',           ctypes.c_uint64),
+                 ('len',              ctypes.c_uint32),
+                 ('speed_hz',         ctypes.c_uint32),
+                 ('delay_usecs',      ctypes.c_uint16),
+                 ('bits_per_word',    ctypes.c_uint8),
+                 ('cs_change',        ctypes.c_uint8),
+                 ('tx_nbits',         ctypes.c_uint8),
+                 ('rx_nbits',         ctypes.c_uint8),
+                 ('word_delay_usecs', ctypes.c_uint8),
+                 ('pad',              ctypes.c_uint8) ]
+
+#SPI_IOC_MESSAGE(N) encodes N * sizeof(spi_ioc_transfer) in the 14 bit ioctl
+#size field, which caps the number of segments per message
+SPI_IOC_MAX_SEGMENTS = ((1 << 14) - 1) // ctypes.sizeof(_SpiIocTransfer)
+
+#Default spidev buffer size, used when the module parameter can't be read
+SPIDEV_DEFAULT_BUFSIZ = 4096
+
+#spidev_message rounds each segment up to ARCH_DMA_MINALIGN before checking
+#the message against bufsiz. 128 is the largest (arm64), so assume it
+SPIDEV_SEGMENT_ALIGN = 128
+
+def _AlignedLength(length: int) -> int:
+    '''
+    :param length: Segment length in bytes
+    :return: Bytes the segment counts for against bufsiz
+    '''
+    return -(-length // SPIDEV_SEGMENT_ALIGN) * SPIDEV_SEGMENT_ALIGN
+
+def _SPI_IOC_MESSAGE(count: int) -> int:
+    '''
+    Equivalent of the SPI_IOC_MESSAGE(N) macro (asm-generic ioctl encoding)
+
+    :param count: Number of spi_ioc_transfer segments in the message
+    :return: ioctl request number
+    '''
+    size = count * ctypes.sizeof(_SpiIocTransfer)
+    return (1 << 30) | (size << 16) | (ord('k') << 8) | 0
+
+def _BufferAddress(buf, writable: bool) -> tuple:
+    '''
+    Resolves the address of a buffer-protocol object so the driver can read
+    or write it directly
+
+    :param buf: Buffer to resolve. Lists are accepted on transmit for
+                compatibility and are converted to bytes
+    :param writable: True if the driver will write into the buffer
+    :return: Tuple of (object to keep alive during the ioctl, address)
+    '''
+    if isinstance(buf, bytes):
+        #bytes are immutable, c_char_p points at the object's own storage
+        ref = ctypes.c_char_p(buf)
+        return (ref, ctypes.cast(ref, ctypes.c_void_p).value)
+
+    try:
+        view = memoryview(buf)
+    except TypeError:
+        return _BufferAddress(bytes(buf), writable)
+
+    if view.readonly:
+        if writable:
+            raise TypeError('Receive buffer must be writable')
+        #ctypes only maps writable buffers, numpy resolves the address of a
+        #readonly one (e.g. a slice of a bytes pattern) without copying it
+        ref = numpy.frombuffer(view, dtype=numpy.uint8)
+        return (ref, ref.ctypes.data)
+
+    ref = (ctypes.c_char * view.nbytes).from_buffer(view)
+    return (ref, ctypes.addressof(ref))
+
 class SPI_spidev(ISPI):
     '''
     Implementation of the ISPI interface class using the spidev package for
@@ -55,20 +133,121 @@ class SPI_spidev(ISPI):
         self.__dev = sd.SpiDev()
         self.__dev.open(bus_id, cs_id)        
 
-    def ReadWrite(self, xmit: list) -> list:
-        return self.__dev.xfer2(xmit)
+        #The driver rejects messages with more total bytes than bufsiz
+        try:
+            with open('/sys/module/spidev/parameters/bufsiz') as f:
+                self.__bufsiz = int(f.read())
+        except (OSError, ValueError):
+            self.__bufsiz = SPIDEV_DEFAULT_BUFSIZ
+
+        #Last mode and speed set, so repeated settings skip the ioctls
+        self.__mode = None
+        self.__speed = None
+        self.__word_delay = 0
+
+    def ReadWrite(self, xmit: bytes, rx: bytearray = None) -> bytes:
+        if rx is None:
+            rx = bytearray(len(xmit))
+        self.__SubmitMessage([xmit], [rx])
+        return rx
+
+    def Read(self, count: int, rx: bytearray = None) -> bytes:
+        if rx is None:
+            rx = bytearray(count)
+        #No transmit buffer, the controller clocks out zeros
+        self.__SubmitMessage([None], [rx])
+        return rx
+
+    def Write(self, xmit: bytes) -> int:
+        if self.__word_delay:
+            #writebytes2 can't delay between bytes
+            self.ReadWrite(xmit)
+            return len(xmit)
 
-    def Read(self, count: int) -> list:
-        return self.__dev.readbytes(count)
+        #writebytes2 takes any buffer-protocol object without conversion
+        self.__dev.writebytes2(xmit)
+        return len(xmit)
 
-    def Write(self, xmit: list) -> int:
-        return self.__dev.writebytes(xmit)
+    def Transfer(self, frames: list, rx_frames: list = None) -> list:
+        return self.TransferSpeeds(frames, None, rx_frames)
+
+    def TransferSpeeds(self, frames: list, speeds: list,
+                       rx_frames: list = None) -> list:
+        #Each segment carries its own speed_hz, so frames at different
+        #clocks share a message and the device speed is left unchanged
+        if rx_frames is None:
+            rx_frames = [bytearray(len(frame)) for frame in frames]
+
+        start = 0
+        while start < len(frames):
+            #Pack as many frames as the driver accepts into one message
+            end = start + 1
+            total = _AlignedLength(len(frames[start]))
+            while ((end < len(frames)) and 
+                   (end - start < SPI_IOC_MAX_SEGMENTS) and
+                   (total + _AlignedLength(len(frames[end])) <= self.__bufsiz)):
+                total += _AlignedLength(len(frames[end]))
+                end += 1
+
+            self.__SubmitMessage(frames[start:end], rx_frames[start:end],
+                                 None if speeds is None else speeds[start:end])
+            start = end
+
+        return rx_frames
 
     def SetMode(self, mode: int) -> None:
-        self.__dev.mode = mode
+        if mode != self.__mode:
+            self.__dev.mode = mode
+            self.__mode = mode
 
     def SetSpeed(self, speed: int) -> None:
-        self.__dev.max_speed_hz = speed
+        if speed != self.__speed:
+            self.__dev.max_speed_hz = speed
+            self.__speed = speed
+
+    def SetWordDelay(self, usecs: int) -> None:
+        if not (0 <= usecs <= 255):
+            raise Exception('spidev word delay must be 0-255 us')
+        self.__word_delay = usecs
 
     def Cleanup(self) -> None:
         self.__dev.close()
+
+    def __SubmitMessage(self, frames: list, rx_frames: list,
+                        speeds: list = None) -> None:
+        '''
+        Submits the frames as a single multi-segment SPI_IOC_MESSAGE. Chip
+        select is toggled between each segment. The driver reads and writes
+        the callers buffers directly.
+
+        :param frames: List of frames to transmit. A None frame transmits
+                       zeros for the length of its receive buffer
+        :param rx_frames: List of writable buffers to receive into
+        :param speeds: Optional list of clock speeds in Hz, one per segment.
+                       Without it, or for a 0 speed, the driver clocks the
+                       segment at the device's max_speed_hz
+        '''
+        count = len(frames)
+        xfers = (_SpiIocTransfer * count)()
+        #Hold a reference to the buffers until the ioctl is complete
+        refs = []
+
+        for i in range(0, count):
+            (rx_ref, rx_addr) = _BufferAddress(rx_frames[i], True)
+            refs.append(rx_ref)
+            xfers[i].rx_buf = rx_addr
+            xfers[i].len = len(rx_ref)
+
+            if frames[i] is not None:
+                (tx_ref, tx_addr) = _BufferAddress(frames[i], False)
+                refs.append(tx_ref)
+                xfers[i].tx_buf = tx_addr
+
+            xfers[i].word_delay_usecs = self.__word_delay
+            if speeds is not None:
+                xfers[i].speed_hz = speeds[i]
+
+            #cs_change on the last segment would leave CS asserted
+            xfers[i].cs_change = 1 if i < (count - 1) else 0
+
+        fcntl.ioctl(self.__dev.fileno(), _SPI_IOC_MESSAGE(count), xfers)
@@ -0,0 +1,137 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import array
+
+class LatencyHistogram:
+    '''
+    Fixed size log-linear histogram of durations in nanoseconds. Each power
+    of two is split into 2^SUB_BUCKET_BITS buckets, so percentiles are
+    within 12.5% while recording is a couple of integer operations and
+    memory never grows.
+    '''
+
+    #Buckets per power of two, as a power of two
+    SUB_BUCKET_BITS = 3
+
+    #Largest recordable value, as a power of two (~18 minutes in ns)
+    MAX_VALUE_BITS = 40
+
+    def __init__(self) -> None:
+        '''
+        Class constructor. Creates an empty histogram
+        '''
+        buckets = (self.MAX_VALUE_BITS + 1) << self.SUB_BUCKET_BITS
+        self.__counts = array.array('Q', bytes(8 * buckets))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def Record(self, value: int, count: int = 1) -> None:
+        '''
+        Records a duration
+
+        :param value: Duration in nanoseconds
+        :param count: Number of times the duration occurred
+        '''
+        shift = value.bit_length() - (self.SUB_BUCKET_BITS + 1)
+        if shift <= 0:
+            bucket = value
+        else:
+            bucket = min((shift << self.SUB_BUCKET_BITS) + (value >> shift),
+                         len(self.__counts) - 1)
+        self.__counts[bucket] += count
+        self.count += count
+        self.total += value * count
+        if value > self.max:
+            self.max = value
+
+    def Percentile(self, percentile: float) -> int:
+        '''
+        Gets a percentile of the recorded durations
+
+        :param percentile: Percentile to get (0-100)
+        :return: Upper bound of the bucket holding the percentile, in ns
+        '''
+        if self.count == 0:
+            return 0
+
+        target = max(1, int(self.count * percentile / 100.0 + 0.5))
+        seen = 0
+        for bucket in range(0, len(self.__counts)):
+            seen += self.__counts[bucket]
+            if seen >= target:
+                return min(self.__BucketUpperBound(bucket), self.max)
+        return self.max
+
+    def Mean(self) -> float:
+        '''
+        :return: Mean of the recorded durations in ns
+        '''
+        if self.count == 0:
+            return 0.0
+        return float(self.total) / float(self.count)
+
+    def Merge(self, other: 'LatencyHistogram') -> None:
+        '''
+        Adds the durations recorded in another histogram to this one
+
+        :param other: Histogram to merge
+        '''
+        for bucket in range(0, len(self.__counts)):
+            self.__counts[bucket] += other.__counts[bucket]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def Reset(self) -> None:
+        '''
+        Clears all recorded durations
+        '''
+        for bucket in range(0, len(self.__counts)):
+            self.__counts[bucket] = 0
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def __BucketUpperBound(self, bucket: int) -> int:
+        '''
+        :param bucket: Bucket index
+        :return: Largest value which falls in the bucket
+        '''
+        if bucket < (2 << self.SUB_BUCKET_BITS):
+            return bucket
+        shift = (bucket >> self.SUB_BUCKET_BITS) - 1
+        mantissa = bucket - (shift << self.SUB_BUCKET_BITS)
+        return ((mantissa + 1) << shift) - 1
@@ -0,0 +1,122 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import numpy
+
+#PRBS generators, name: (order, tap) of the recurrence 
+#s[k] = s[k - order] ^ s[k - tap], i.e. the ITU-T O.150 polynomials
+#x^7 + x^6 + 1, x^15 + x^14 + 1 and x^31 + x^28 + 1
+PRBS_TAPS = { 'prbs7':  (7, 6),
+              'prbs15': (15, 14),
+              'prbs31': (31, 28) }
+
+#Patterns repeating a fixed byte sequence
+FIXED_PATTERNS = { 'walking1':    bytes(1 << bit for bit in range(7, -1, -1)),
+                   'walking0':    bytes(0xFF ^ (1 << bit) for bit in range(7, -1, -1)),
+                   'alternating': bytes((0x55, 0xAA)),
+                   'transitions': bytes((0x55,)) }
+
+#All pattern names
+PATTERN_NAMES = ('random',) + tuple(PRBS_TAPS.keys()) + tuple(FIXED_PATTERNS.keys())
+
+#Generated patterns by (name, length, seed)
+_pattern_cache = {}
+
+def GetPattern(name: str, length: int, seed: int = 0) -> bytes:
+    '''
+    Gets a test pattern. Patterns are generated once and cached, so 
+    exercisers can slice their frames out of the same buffer every run
+
+    :param name: Pattern name, one of PATTERN_NAMES
+    :param length: Pattern length in bytes
+    :param seed: Seed of the random pattern and start state of the PRBS
+                 patterns. Fixed patterns ignore it
+    :return: Pattern bytes
+    '''
+    if name in FIXED_PATTERNS:
+        #The seed makes no difference
+        seed = 0
+
+    key = (name, length, seed)
+    pattern = _pattern_cache.get(key)
+    if pattern is None:
+        if name == 'random':
+            pattern = numpy.random.default_rng(seed).bytes(length)
+        elif name in PRBS_TAPS:
+            pattern = _GeneratePRBS(*PRBS_TAPS[name], length, seed)
+        elif name in FIXED_PATTERNS:
+            repeat = FIXED_PATTERNS[name]
+            pattern = (repeat * (length // len(repeat) + 1))[:length]
+        else:
+            raise Exception('Unknown pattern: ' + str(name))
+        _pattern_cache[key] = pattern
+    return pattern
+
+def _GeneratePRBS(order: int, tap: int, length: int, seed: int) -> bytes:
+    '''
+    Generates a PRBS bit stream, packed MSB first. Squaring the generator
+    polynomial gives s[k] = s[k - order * 2^j] ^ s[k - tap * 2^j] for any j,
+    so once enough bits exist, tap * 2^j bits at a time are computed with a
+    single XOR. Long sequences take a few dozen array operations rather
+    than one per bit.
+
+    :param order: Register length of the generator
+    :param tap: Second tap of the generator
+    :param length: Length in bytes
+    :param seed: Selects the non zero start state
+    :return: PRBS bytes
+    '''
+    total = order + length * 8
+    bits = numpy.zeros(total, dtype=numpy.uint8)
+
+    #Start state, never all zeros
+    state = (seed % ((1 << order) - 1)) + 1
+    for i in range(0, order):
+        bits[i] = (state >> (order - 1 - i)) & 0x1
+
+    count = order
+    while count < total:
+        #Largest doubling the bits so far cover
+        shift = 0
+        while (order << (shift + 1)) <= count:
+            shift += 1
+
+        chunk = min(tap << shift, total - count)
+        far = count - (order << shift)
+        near = count - (tap << shift)
+        numpy.bitwise_xor(bits[far:far + chunk], bits[near:near + chunk],
+                          out=bits[count:count + chunk])
+        count += chunk
+
+    return numpy.packbits(bits[order:]).tobytes()
@@ -0,0 +1,212 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import logging
+import queue
+import threading
+import time
+from ISPI import ISPI
+from IExerciser import ExercisePlan, FinishBatch
+from ExerciseResult import ExerciseResult
+
+class BufferPool:
+    '''
+    Pool of receive buffers reused from batch to batch. A batch's frames 
+    are received into views of one bytearray, as with AllocateFrames, and
+    the bytearray goes back to the pool once the batch is verified. Only a
+    bounded number of free buffers of each size are kept.
+    '''
+
+    def __init__(self, max_free: int) -> None:
+        '''
+        Class constructor.
+
+        :param max_free: Most free buffers kept of each size
+        '''
+        self.__max_free = max_free
+        #Size in bytes: list of free bytearrays
+        self.__free = {}
+        self.__lock = threading.Lock()
+
+    def Get(self, frames: list) -> tuple:
+        '''
+        Takes a buffer sized for a list of frames from the pool, allocating
+        one if none are free
+
+        :param frames: List of frames to size the receive buffers from
+        :return: (buffer, list of writable memoryviews, same lengths as frames)
+        '''
+        size = sum(len(frame) for frame in frames)
+        with self.__lock:
+            free = self.__free.get(size)
+            block = free.pop() if free else None
+        if block is None:
+            block = bytearray(size)
+
+        view = memoryview(block)
+        rx_frames = []
+        offset = 0
+        for frame in frames:
+            rx_frames.append(view[offset:offset + len(frame)])
+            offset += len(frame)
+        return (block, rx_frames)
+
+    def Put(self, block: bytearray) -> None:
+        '''
+        Returns a buffer to the pool
+
+        :param block: Buffer from Get, no longer in use
+        '''
+        with self.__lock:
+            free = self.__free.setdefault(len(block), [])
+            if len(free) < self.__max_free:
+                free.append(block)
+
+
+class PipelinedEngine:
+    '''
+    Runs built exercises as three concurrent stages joined by bounded
+    queues, so the bus isn't left idle while Python builds and checks
+    frames:
+
+        producer thread  - iterates the plan's batches, which may be a
+                           generator building them on demand, and takes
+                           receive buffers from the pool
+        calling thread   - transfers each batch on the interface
+        verifier thread  - counts, traces and verifies each batch, then 
+                           returns its buffers to the pool
+
+    The interface is only used from the calling thread. The overlap comes
+    from blocking driver calls (spidev ioctls, Aardvark library calls) and
+    numpy releasing the GIL, interfaces implemented in pure Python gain
+    little.
+    '''
+
+    def __init__(self, depth: int = 4) -> None:
+        '''
+        Class constructor.
+
+        :param depth: Batches each queue holds, bounding how far the 
+                      producer runs ahead and the verifier falls behind
+        '''
+        self.__depth = depth
+        self.__pool = BufferPool(2 * depth + 1)
+
+    def Run(self, iface: ISPI, plan: ExercisePlan) -> ExerciseResult:
+        '''
+        Runs a built exercise
+
+        :param iface: ISPI Interface to exercise against
+        :param plan: Built exercise
+        :return: The plan's result
+        '''
+        iface.SetMode(plan.mode)
+        result = plan.result
+
+        #None marks the end of each queue
+        to_transfer = queue.Queue(self.__depth)
+        to_verify = queue.Queue(self.__depth)
+        errors = []
+        stop = threading.Event()
+        pool = self.__pool
+
+        def Produce() -> None:
+            try:
+                for batch in plan.batches:
+                    if stop.is_set():
+                        break
+                    if batch.rx_frames is None:
+                        (block, rx_frames) = pool.Get(batch.frames)
+                    else:
+                        (block, rx_frames) = (None, batch.rx_frames)
+                    to_transfer.put((batch, rx_frames, block))
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                to_transfer.put(None)
+
+        def Verify() -> None:
+            while True:
+                item = to_verify.get()
+                if item is None:
+                    return
+                if stop.is_set():
+                    #Keep draining so the transfer stage never blocks
+                    continue
+
+                (batch, received, block, elapsed) = item
+                try:
+                    if batch.timed:
+                        result.payload_time += elapsed
+                    FinishBatch(result, batch, received)
+                    if block is not None:
+                        pool.Put(block)
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+
+        producer = threading.Thread(target=Produce, daemon=True)
+        verifier = threading.Thread(target=Verify, daemon=True)
+        producer.start()
+        verifier.start()
+
+        try:
+            while True:
+                item = to_transfer.get()
+                if item is None:
+                    break
+                if stop.is_set():
+                    #Keep draining so the producer never blocks
+                    continue
+
+                (batch, rx_frames, block) = item
+                start = time.perf_counter()
+                received = iface.Transfer(batch.frames, rx_frames)
+                to_verify.put((batch, received, block, time.perf_counter() - start))
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+            while to_transfer.get() is not None:
+                pass
+        finally:
+            to_verify.put(None)
+            verifier.join()
+            producer.join()
+
+        if errors:
+            raise errors[0]
+
+        logging.info('%d Tests / %d Success', result.test_count, result.success_count)
+        return result
@@ -0,0 +1,137 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import importlib
+
+class Registry:
+    '''
+    Maps names to implementation classes without importing them up front.
+    Built in implementations are given as 'module:Class' strings and only
+    imported when selected. Third party implementations are discovered
+    through the package entry points of a group, e.g. a package declaring
+
+        [project.entry-points."spi_exerciser.exercisers"]
+        mydevice = "my_package.exerciser:Exerciser_MyDevice"
+
+    adds the 'mydevice' exerciser
+    '''
+
+    def __init__(self, group: str, builtins: dict) -> None:
+        '''
+        Class constructor.
+
+        :param group: Entry point group third party implementations are
+                      declared in
+        :param builtins: Dictionary of built in names and 'module:Class' paths
+        '''
+        self.__group = group
+        self.__paths = dict(builtins)
+        self.__builtins = list(builtins.keys())
+        self.__entry_points = None
+        self.__classes = {}
+
+    def __FindEntryPoints(self) -> dict:
+        '''
+        Looks up the entry points of the group on first use, as scanning the
+        installed packages is slow compared to the rest of startup
+
+        :return: Dictionary of entry point names and entry points
+        '''
+        if self.__entry_points is None:
+            import importlib.metadata
+            found = importlib.metadata.entry_points()
+            if hasattr(found, 'select'):
+                found = found.select(group=self.__group)
+            else:
+                #Python < 3.10 returns a dict of groups
+                found = found.get(self.__group, [])
+
+            #Built in names can't be replaced
+            self.__entry_points = { entry.name.lower(): entry for entry in found
+                                    if entry.name.lower() not in self.__paths }
+        return self.__entry_points
+
+    def Builtins(self) -> list:
+        '''
+        :return: Names of the built in implementations
+        '''
+        return list(self.__builtins)
+
+    def Names(self) -> list:
+        '''
+        :return: Names of the built in and installed third party implementations
+        '''
+        return self.__builtins + sorted(self.__FindEntryPoints().keys())
+
+    def __contains__(self, name: str) -> bool:
+        name = name.lower()
+        return (name in self.__paths) or (name in self.__FindEntryPoints())
+
+    def Load(self, name: str) -> type:
+        '''
+        Imports and returns the class of an implementation
+
+        :param name: Implementation name
+        :return: Implementation class
+        '''
+        name = name.lower()
+        if name not in self.__classes:
+            if name in self.__paths:
+                (module, cls) = self.__paths[name].split(':')
+                self.__classes[name] = getattr(importlib.import_module(module), cls)
+            elif name in self.__FindEntryPoints():
+                self.__classes[name] = self.__FindEntryPoints()[name].load()
+            else:
+                raise Exception('%s is not a known %s' % (name, self.__group))
+        return self.__classes[name]
+
+    def Name(self, cls: type) -> str:
+        '''
+        :param cls: Implementation class
+        :return: Name of the implementation
+        '''
+        for name, loaded in self.__classes.items():
+            if loaded is cls:
+                return name
+
+        #Classes passed to worker processes weren't loaded through this
+        #registry, so match them on their import path
+        path = '%s:%s' % (cls.__module__, cls.__qualname__)
+        for name, cls_path in self.__paths.items():
+            if cls_path == path:
+                return name
+        for name, entry in self.__FindEntryPoints().items():
+            if entry.value == path:
+                return name
+        raise Exception('%s is not a loaded %s' % (cls.__name__, self.__group))
@@ -0,0 +1,115 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import datetime
+import json
+import sqlite3
+from ExerciseResult import ExerciseResult
+
+class ResultCache:
+    '''
+    On disk store of frequency point results, so interrupted or extended 
+    sweeps only measure the points they don't already have. Points are keyed
+    by the target and exerciser configuration plus the frequency, and are
+    committed as soon as they are stored. SQLite handles the locking between
+    the threads and processes of a multi-target run, each of which opens its
+    own cache.
+
+    Results are stored as versioned JSON (ExerciseResult.ToDict). Points 
+    stored by another version of the result layout are treated as missing,
+    so they are measured again and replaced.
+    '''
+
+    def __init__(self, path: str) -> None:
+        '''
+        Class constructor. Opens or creates the cache
+
+        :param path: Cache file path
+        '''
+        self.__db = sqlite3.connect(path, timeout=30.0)
+        self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute('CREATE TABLE IF NOT EXISTS points ('
+                          'interface TEXT, bus INTEGER, cs INTEGER, '
+                          'exerciser TEXT, config TEXT, freq INTEGER, '
+                          'timestamp TEXT, result BLOB, '
+                          'PRIMARY KEY (interface, bus, cs, exerciser, config, freq))')
+        self.__db.commit()
+
+    def Get(self, key: tuple, freq: int) -> ExerciseResult:
+        '''
+        Looks up a stored point
+
+        :param key: (interface, bus, cs, exerciser, config) of the target
+        :param freq: SPI clock frequency in Hz
+        :return: Stored result, None if the point hasn't been measured or was
+                 stored with another result layout
+        '''
+        row = self.__db.execute('SELECT result FROM points WHERE interface=? AND '
+                                'bus=? AND cs=? AND exerciser=? AND config=? AND freq=?',
+                                key + (freq,)).fetchone()
+        if row is None:
+            return None
+
+        try:
+            record = json.loads(row[0])
+        except ValueError:
+            #Written before results were stored as JSON
+            return None
+        if not isinstance(record, dict):
+            return None
+
+        result = ExerciseResult.FromDict(record)
+        if result is not None:
+            result.cached = True
+        return result
+
+    def Put(self, key: tuple, freq: int, result: ExerciseResult) -> None:
+        '''
+        Stores a point, replacing any previous result
+
+        :param key: (interface, bus, cs, exerciser, config) of the target
+        :param freq: SPI clock frequency in Hz
+        :param result: Exercise result
+        '''
+        self.__db.execute('INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                          key + (freq, 
+                                 datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                                 json.dumps(result.ToDict())))
+        self.__db.commit()
+
+    def Close(self) -> None:
+        '''
+        Closes the cache
+        '''
+        self.__db.close()
@@ -0,0 +1,246 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import argparse
+import contextlib
+import io
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from IResultSink import IResultSink
+from Interfaces.SPI_sim import SPI_sim
+from Exercisers.Exerciser_AD5592r import Exerciser_AD5592r
+from Exercisers.Exerciser_ADXL355 import Exerciser_ADXL355
+from Exercisers.Exerciser_Loopback import Exerciser_Loopback
+from PipelinedEngine import PipelinedEngine
+from SPI_Exerciser import CreateArgParser, RunSingleTarget, RunExercise, ArgCheckPositive
+
+#Clock the benchmarks run at, at the sim cutoff so the bus is clean
+BENCH_FREQ = 1000000
+
+class _CountingSink(IResultSink):
+    '''
+    Result sink that only counts the frames of the swept points
+    '''
+    def __init__(self) -> None:
+        super().__init__()
+        self.transfer_count = 0
+
+    def Write(self, record: dict) -> None:
+        self.transfer_count += record['transfer_count']
+
+    def Close(self) -> None:
+        pass
+
+
+def ExerciserCase(exerciser, device: str, rounds: int, 
+                  engine: PipelinedEngine = None):
+    '''
+    Builds a benchmark case running an exerciser against the sim interface
+
+    :param exerciser: Exerciser instance
+    :param device: Sim device to run against
+    :param rounds: Exercises per run
+    :param engine: Optional engine to run the exercises on
+    :return: Function running the case and returning the frame count
+    '''
+    def Run() -> int:
+        spi = SPI_sim(device, BENCH_FREQ, seed=0)
+        spi.SetSpeed(BENCH_FREQ)
+        frames = 0
+        for index in range(0, rounds):
+            frames += RunExercise(spi, exerciser, engine).transfer_count
+        return frames
+    return Run
+
+
+def SweepCase(argv: list):
+    '''
+    Builds a benchmark case running a whole sweep through the runner against
+    the sim interface, with the console output discarded
+
+    :param argv: Command line arguments of the sweep
+    :return: Function running the case and returning the frame count
+    '''
+    args = CreateArgParser().parse_args(['-i', 'sim', '--sim-seed', '0'] + argv)
+
+    def Run() -> int:
+        sink = _CountingSink()
+        with contextlib.redirect_stdout(io.StringIO()):
+            RunSingleTarget(args, sink)
+        return sink.transfer_count
+    return Run
+
+
+#Benchmark cases, name: function returning the frames it transferred
+BENCH_CASES = { 'loopback':       ExerciserCase(Exerciser_Loopback(0), 'loopback', 100),
+                'loopback-block': ExerciserCase(Exerciser_Loopback(0, block=True), 
+                                                'loopback', 100),
+                'loopback-pipeline': ExerciserCase(Exerciser_Loopback(0, block=True), 
+                                                   'loopback', 100, PipelinedEngine(4)),
+                'ad5592r':        ExerciserCase(Exerciser_AD5592r(), 'ad5592r', 100),
+                'ad5592r-pipeline': ExerciserCase(Exerciser_AD5592r(True), 'ad5592r', 100),
+                'adxl355':        ExerciserCase(Exerciser_ADXL355(), 'adxl355', 100),
+                'sweep':          SweepCase(['--start', '100000', '--end', '1000000', 
+                                             '--step', '20000']),
+                'search':         SweepCase(['-e', 'ad5592r', '--search', 
+                                             '--start', '100000', '--end', '4000000',
+                                             '--step', '10000']) }
+
+
+def RunCase(run, repeat: int) -> dict:
+    '''
+    Runs a benchmark case, timing the best of several runs and measuring
+    the peak memory of a separate traced run
+
+    :param run: Case function
+    :param repeat: Number of timed runs
+    :return: Case results
+    '''
+    best = None
+    frames = 0
+    for index in range(0, repeat):
+        start = time.perf_counter()
+        frames = run()
+        elapsed = time.perf_counter() - start
+        if (best is None) or (elapsed < best):
+            best = elapsed
+
+    #tracemalloc slows the run down, so it is kept out of the timing
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return { 'frames': frames,
+             'time': best,
+             'tps': frames / best,
+             'us_per_frame': best * 1e6 / frames,
+             'peak_kib': peak / 1024.0 }
+
+
+def Compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    '''
+    Prints the results against a baseline
+
+    :param results: Case results of this run
+    :param baseline: Case results of the baseline
+    :param tolerance: Allowed slow down or memory growth in percent
+    :return: True if no case regressed beyond the tolerance
+    '''
+    passed = True
+    print('%-16s %12s %12s %8s %12s %8s' % 
+          ('Case', 'us/frame', 'baseline', 'change', 'peak KiB', 'change'))
+    for name, result in results.items():
+        if name not in baseline:
+            print('%-16s %12.3f %12s' % (name, result['us_per_frame'], 'new'))
+            continue
+
+        base = baseline[name]
+        if (base['us_per_frame'] <= 0.0) or (base['peak_kib'] <= 0.0):
+            #Nothing to scale the change by, e.g. a hand edited baseline
+            print('%-16s %12.3f %12s' % (name, result['us_per_frame'], 'invalid'))
+            continue
+
+        time_change = (result['us_per_frame'] / base['us_per_frame'] - 1.0) * 100.0
+        mem_change = (result['peak_kib'] / base['peak_kib'] - 1.0) * 100.0
+        regressed = (time_change > tolerance) or (mem_change > tolerance)
+        if regressed:
+            passed = False
+        print('%-16s %12.3f %12.3f %+7.1f%% %12.1f %+7.1f%%%s' % 
+              (name, result['us_per_frame'], base['us_per_frame'], time_change,
+               result['peak_kib'], mem_change, '  REGRESSED' if regressed else ''))
+    return passed
+
+
+def ArgCheckCases(value):
+    '''
+    Checks the --cases argument
+
+    :param value: Comma separated benchmark case names
+    :return: List of the case names
+    '''
+    cases = value.split(',')
+    for case in cases:
+        if case not in BENCH_CASES:
+            raise argparse.ArgumentTypeError('%s is not a benchmark case' % case)
+    return cases
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(
+        description='Benchmarks the host side cost of the exercisers and sweeps ' +
+                    'against the sim interface')
+    argParser.add_argument('--cases', dest='cases', type=ArgCheckCases,
+        default=list(BENCH_CASES.keys()), 
+        help='Comma separated cases to run: ' + ','.join(BENCH_CASES.keys()))
+    argParser.add_argument('--repeat', dest='repeat', type=ArgCheckPositive, default=5,
+        help='Timed runs per case, the best is kept')
+    argParser.add_argument('--save', dest='save', default=None,
+        help='Save the results as a baseline file')
+    argParser.add_argument('--compare', dest='compare', default=None,
+        help='Compare the results against a baseline file')
+    argParser.add_argument('--tolerance', dest='tolerance', type=float, default=10.0,
+        help='Slow down or memory growth (%%) over the baseline that fails the compare')
+    args = argParser.parse_args()
+
+    logging.getLogger().disabled = True
+
+    results = {}
+    print('%-16s %10s %12s %12s %10s' % 
+          ('Case', 'frames', 'tps', 'us/frame', 'peak KiB'))
+    for name in args.cases:
+        result = RunCase(BENCH_CASES[name], args.repeat)
+        results[name] = result
+        print('%-16s %10d %12.0f %12.3f %10.1f' % 
+              (name, result['frames'], result['tps'], result['us_per_frame'],
+               result['peak_kib']))
+
+    if args.save is not None:
+        with open(args.save, 'w') as baseline_file:
+            json.dump({ 'python': platform.python_version(),
+                        'machine': platform.machine(),
+                        'cases': results }, baseline_file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['cases']
+        print()
+        if not Compare(results, baseline, args.tolerance):
+            sys.exit(1)
@@ -33,23 +33,68 @@
  * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 import argparse
+import collections
+import contextlib
+import datetime
 import logging
+import queue
+import sys
+import threading
 import time
-from Interfaces.SPI_spidev import SPI_spidev
-from Interfaces.SPI_aardvark import SPI_aardvark
-from Exercisers.Exerciser_AD5592r import Exerciser_AD5592r
-from Exercisers.Exerciser_Loopback import Exerciser_Loopback
-from Exercisers.Exerciser_ADXL355 import Exerciser_ADXL355
+from Interfaces.SPI_sim import SIM_DEVICES
+from Interfaces.SPI_instrumented import SPI_instrumented
+from ExerciseResult import ExerciseResult, BURST_BUCKETS
+from IExerciser import IExerciser, ExerciseBatch, ExercisePlan, RunPlan, RunPlansInterleaved
+from ISPI import ISPI
+from Trace import Trace
+from Patterns import PATTERN_NAMES
+from Registry import Registry
+from PipelinedEngine import PipelinedEngine
+from SequentialTest import SequentialTest, SPRT_UNDECIDED, SPRT_PASS, SPRT_FAIL
+from SoakStats import SoakStats
+from IResultSink import IResultSink, BUS_STAT_FIELDS
 
 
-#Dictionary of possible Exerciser names and the classes
-EXERCISER_DICT = { 'ad5592r': Exerciser_AD5592r,
-                   'adxl355': Exerciser_ADXL355,
-                   'loopback': Exerciser_Loopback }
+#Possible Exerciser names and the classes. Only the selected exercisers are
+#imported, third party exercisers are found through their entry points
+EXERCISERS = Registry('spi_exerciser.exercisers',
+                      { 'ad5592r': 'Exercisers.Exerciser_AD5592r:Exerciser_AD5592r',
+                        'adxl355': 'Exercisers.Exerciser_ADXL355:Exerciser_ADXL355',
+                        'bulk': 'Exercisers.Exerciser_Bulk:Exerciser_Bulk',
+                        'loopback': 'Exercisers.Exerciser_Loopback:Exerciser_Loopback' })
 
-#Dictionary of possible interface names and the classes
-INTERFACE_DICT = { 'spidev': SPI_spidev,
-                   'aardvark': SPI_aardvark}
+#Possible interface names and the classes. Only the selected interfaces are
+#imported, third party interfaces are found through their entry points
+INTERFACES = Registry('spi_exerciser.interfaces',
+                      { 'spidev': 'Interfaces.SPI_spidev:SPI_spidev',
+                        'aardvark': 'Interfaces.SPI_aardvark:SPI_aardvark',
+                        'sim': 'Interfaces.SPI_sim:SPI_sim',
+                        'replay': 'Interfaces.SPI_replay:SPI_replay' })
+
+#Possible result output formats and the sink classes. Only the selected
+#sink is imported
+SINKS = Registry('spi_exerciser.sinks',
+                 { 'jsonl': 'Sinks.Sink_JSONL:Sink_JSONL',
+                   'csv': 'Sinks.Sink_CSV:Sink_CSV' })
+
+#Names of the sequential test decisions
+DECISION_NAMES = { SPRT_UNDECIDED: 'undecided',
+                   SPRT_PASS: 'pass',
+                   SPRT_FAIL: 'fail' }
+
+#Frames the soak error captures hold, across all of a round's failures
+SOAK_CAPTURE_SLOTS = 256
+
+#Seconds a multi target run waits for results before checking whether its
+#workers are still alive
+WORKER_POLL_SECONDS = 1.0
+
+#Sweep target given on the command line as 
+#interface:bus:cs:exerciser[:start:end:step]. The frequency range is None when
+#the target uses the command line range
+SweepTarget = collections.namedtuple('SweepTarget', 
+    ['name', 'interface', 'bus', 'cs', 'exerciser', 
+     'start_freq', 'end_freq', 'step_freq'])
 
 
 def RunMain(args):
@@ -63,21 +108,513 @@ def RunMain(args):
     if(args.start_freq > args.end_freq):
         print('Start Frequency must be before End Frequency')
         return
-    
-    #Create the interface instance.
-    if args.interface is SPI_spidev:
+
+    if args.matrix and (args.search or args.targets or (args.aardvark_ids is not None)):
+        print('Matrix mode runs a single target sweep, it can\'t be used with ' +
+              '--search, --target or --aardvark-ids')
+        return
+
+    if (args.soak is not None) and (args.matrix or args.search or args.targets or 
+                                    (args.aardvark_ids is not None) or args.sequential):
+        print('Soak mode runs a single target, it can\'t be used with --matrix, ' +
+              '--search, --target, --aardvark-ids or --sequential')
+        return
+
+    if args.interleave and (args.matrix or args.search or args.sequential or 
+                            (args.soak is not None) or args.use_async or 
+                            args.pipeline or (args.cache is not None)):
+        print('Interleaved mode runs every frequency in one submission, it can\'t be ' +
+              'used with --matrix, --search, --sequential, --soak, --async, ' +
+              '--pipeline or --cache')
+        return
+
+    if args.use_async and (args.matrix or args.search or args.sequential or 
+                           args.processes or (args.cache is not None)):
+        print('Async mode sweeps targets, it can\'t be used with --matrix, ' +
+              '--search, --sequential, --processes or --cache')
+        return
+
+    if args.aardvark_ids is not None:
+        #One target per dongle, each in its own process
+        ids = args.aardvark_ids
+        if ids == 'all':
+            ids = INTERFACES.Load('aardvark').FindDongles()
+            if not ids:
+                print('No Aardvark dongles found')
+                return
+        args.targets.extend(ArgCheckTarget('aardvark:%d:0:%s' % 
+                                           (dongle_id, ExerciserName(args.exerciser)))
+                            for dongle_id in ids)
+        args.processes = not args.use_async
+
+    if args.use_async and not args.targets:
+        #The target selected by -i, -e, --bus and --cs
+        args.targets.append(ArgCheckTarget('%s:%d:%d:%s' % 
+            (InterfaceName(args.interface), args.bus_num, args.cs_num, 
+             ExerciserName(args.exerciser))))
+
+    if (args.capture is not None) and args.processes:
+        print('Worker processes can\'t share a --capture log, use threads or --async')
+        return
+
+    sink = None
+    if args.output is not None:
+        sink = SINKS.Load(args.output_format)(args.output)
+
+    if args.capture is not None:
+        #import here so the capture log is only loaded when capturing
+        from CaptureLog import CaptureWriter
+        CaptureWriter.Enable(args.capture)
+
+    #With the records streamed to stdout the console report goes to stderr,
+    #so the stream stays parseable. The sink already holds the real stdout
+    console = contextlib.nullcontext()
+    if args.output == '-':
+        console = contextlib.redirect_stdout(sys.stderr)
+
+    try:
+        with console:
+            if args.soak is not None:
+                RunSoak(args, sink)
+            elif args.matrix:
+                RunMatrix(args, sink)
+            elif args.use_async:
+                RunTargetsAsync(args, sink)
+            elif args.targets:
+                RunTargets(args, sink)
+            else:
+                RunSingleTarget(args, sink)
+    finally:
+        if sink is not None:
+            sink.Close()
+
+        if args.capture is not None:
+            CaptureWriter.Disable()
+
+        #Dump whatever is left in the trace
+        if Trace.active is not None:
+            Trace.active.Dump('Exit')
+
+
+def RunSingleTarget(args, sink: IResultSink) -> None:
+    '''
+    Runs the sweep or search on the target selected by -i, -e, --bus and --cs
+
+    :param args: Parsed command line arguments
+    :param sink: Result output, or None
+    '''
+    target = SweepTarget(None, args.interface, args.bus_num, args.cs_num,
+                         args.exerciser, None, None, None)
+
+    def Report(freq: int, result: ExerciseResult) -> None:
+        ReportPoint(target, freq, result, args, sink)
+
+    spi = CreateInterface(args.interface, args.bus_num, args.cs_num, 
+                          args.exerciser, args)
+    exerciser = CreateExerciser(args.exerciser, args)
+
+    if args.search:
+        max_freq = RunSearch(spi, exerciser, args, report=Report)
+        PrintSearchResult(max_freq, args)
+        return
+
+    #Run all the frequencies
+    RunSweep(spi, exerciser, target, args, report=Report)
+
+
+def InterfaceName(interface: type) -> str:
+    '''
+    :param interface: ISPI class
+    :return: Command line name of the interface
+    '''
+    return INTERFACES.Name(interface)
+
+
+def ExerciserName(exerciser: type) -> str:
+    '''
+    :param exerciser: IExerciser class
+    :return: Command line name of the exerciser
+    '''
+    return EXERCISERS.Name(exerciser)
+
+
+def CreateInterface(interface: type, bus: int, cs: int, exerciser: type,
+                    args) -> ISPI:
+    '''
+    Creates an interface instance
+
+    :param interface: ISPI class to create
+    :param bus: Bus number (spidev) or dongle ID (aardvark)
+    :param cs: Chip select number (spidev)
+    :param exerciser: IExerciser class which will be run on the interface
+    :param args: Parsed command line arguments
+    :return: Interface instance
+    '''
+    name = InterfaceName(interface)
+    if name == 'spidev':
         #SPI Dev has extra arguments
-        spi = SPI_spidev(args.bus_num, args.cs_num)
+        spi = interface(bus, cs)
+    elif name == 'aardvark':
+        spi = interface(bus)
+    elif name == 'sim':
+        #By default simulate the device the exerciser expects
+        device = args.sim_device
+        if device is None:
+            device = ExerciserName(exerciser)
+            if device == 'bulk':
+                #Bulk streams through a loopback
+                device = 'loopback'
+        spi = interface(device, args.sim_cutoff, seed=args.sim_seed)
+    elif name == 'replay':
+        if args.replay is None:
+            raise Exception('The replay interface needs a --replay capture log')
+        spi = interface(args.replay, bus, cs)
     else:
-        spi = args.interface()
+        #Third party interfaces are given the bus and chip select
+        spi = interface(bus, cs)
+
+    #Capture outside the instrumentation, so the latencies measured don't
+    #include the log writes
+    if args.instrument:
+        spi = SPI_instrumented(spi)
+
+    if args.capture is not None:
+        from Interfaces.SPI_capture import SPI_capture
+        from CaptureLog import CaptureWriter
+        spi = SPI_capture(spi, CaptureWriter.active, bus, cs)
+    return spi
+
+
+def FindInstrumented(spi: ISPI) -> SPI_instrumented:
+    '''
+    :param spi: Interface from CreateInterface
+    :return: The instrumentation of the interface, under any capture, or 
+             None if it isn't instrumented
+    '''
+    #The capture is the only interface wrapping another, and it may not be
+    #imported to check against
+    if hasattr(spi, 'Wrapped'):
+        spi = spi.Wrapped()
+    return spi if isinstance(spi, SPI_instrumented) else None
 
-    #Create the exerciser instance
-    if args.exerciser is Exerciser_Loopback:
+
+def CreateExerciser(exerciser: type, args, mode: int = None) -> IExerciser:
+    '''
+    Creates an exerciser instance
+
+    :param exerciser: IExerciser class to create
+    :param args: Parsed command line arguments
+    :param mode: Optional SPI mode overriding the exerciser's own
+    :return: Exerciser instance
+    '''
+    return exerciser(*ExerciserArgs(exerciser, args, mode))
+
+
+def ExerciserArgs(exerciser: type, args, mode: int = None) -> tuple:
+    '''
+    :param exerciser: IExerciser class
+    :param args: Parsed command line arguments
+    :param mode: Optional SPI mode overriding the exerciser's own
+    :return: Constructor arguments of the exerciser
+    '''
+    name = ExerciserName(exerciser)
+    if name == 'loopback':
         #Loopback has extra arguments
-        exerciser = args.exerciser(args.lbmode)
+        return (args.lbmode if mode is None else mode, args.iterations, args.lbblock,
+                args.pattern, args.seed)
+    elif name == 'bulk':
+        #Bulk uses the loopback mode and has its own sizes
+        return (args.lbmode if mode is None else mode, args.bulk_size, args.bulk_frame,
+                args.pattern, args.seed)
+
+    #The device exercisers default to the mode of their device
+    mode_args = () if mode is None else (mode,)
+    if name == 'ad5592r':
+        return (args.ad5592r_pipeline,) + mode_args
+    elif name == 'adxl355':
+        return (args.adxl_burst, args.adxl_stream, args.adxl_odr,
+                args.pattern, args.seed) + mode_args
+    elif mode is not None:
+        raise Exception('The %s exerciser has no SPI mode option' % name)
     else:
-        exerciser = args.exerciser()
+        return ()
+
+
+def CacheKey(target: SweepTarget, args) -> tuple:
+    '''
+    Builds the result cache key of a target. The configuration covers 
+    everything besides the frequency that changes what a point measures
+
+    :param target: Sweep target
+    :param args: Parsed command line arguments
+    :return: (interface, bus, cs, exerciser, config) key
+    '''
+    config = { 'exerciser': ExerciserArgs(target.exerciser, args) }
+    if args.sequential:
+        config['sequential'] = (args.confidence, args.max_error_rate, args.max_rounds)
+    if InterfaceName(target.interface) == 'sim':
+        config['sim'] = (args.sim_device, args.sim_cutoff, args.sim_seed)
+
+    return (InterfaceName(target.interface), target.bus, target.cs,
+            ExerciserName(target.exerciser), repr(config))
+
+
+def RunMatrix(args, sink: IResultSink) -> None:
+    '''
+    Runs the exercise on the target selected by -i, -e, --bus and --cs for
+    every combination of SPI mode, frequency and word delay, then prints the
+    success rates as a grid. The mode changes least often and the word
+    delay, a per transfer setting, most often, so the interface is
+    reconfigured as little as possible
+
+    :param args: Parsed command line arguments
+    :param sink: Result output, or None
+    '''
+    target = SweepTarget(None, args.interface, args.bus_num, args.cs_num,
+                         args.exerciser, None, None, None)
+
+    spi = CreateInterface(args.interface, args.bus_num, args.cs_num, 
+                          args.exerciser, args)
+    freqs = BuildFreqSet(args)
+    delays = args.word_delays
+
+    engine = CreateEngine(args)
+    grid = {}
+    for mode in args.modes:
+        exerciser = CreateExerciser(args.exerciser, args, mode)
+        for freq in freqs:
+            for delay in delays:
+                def Report(freq: int, result: ExerciseResult) -> None:
+                    result.word_delay = delay
+                    ReportPoint(target, freq, result, args, sink)
+
+                spi.SetWordDelay(delay)
+                grid[(mode, delay, freq)] = RunPoint(spi, exerciser, freq, args, 
+                                                     report=Report, engine=engine)
+
+    rows = [(mode, delay) for mode in args.modes for delay in delays]
+    PrintMatrix(grid, rows, freqs, args)
+    if args.heatmap is not None:
+        SaveHeatmap(grid, rows, freqs, args)
+
+
+def MatrixRowLabel(mode: int, delay: int, args) -> str:
+    '''
+    :param mode: SPI mode of the row
+    :param delay: Word delay (us) of the row
+    :param args: Parsed command line arguments
+    :return: Label of a matrix row, with the delay only when several are run
+    '''
+    if args.word_delays == [0]:
+        return 'Mode %d' % mode
+    return 'Mode %d, %d us' % (mode, delay)
 
+
+def PrintMatrix(grid: dict, rows: list, freqs: list, args) -> None:
+    '''
+    Prints the success rate of every matrix point as a grid, a row per
+    mode and word delay and a column per frequency
+
+    :param grid: Dictionary of (mode, delay, freq) and exercise results
+    :param rows: List of (mode, delay) rows
+    :param freqs: List of frequencies
+    :param args: Parsed command line arguments
+    '''
+    label_width = max(len(MatrixRowLabel(mode, delay, args)) for (mode, delay) in rows)
+    col_width = max(max(len(str(freq)) for freq in freqs), 6)
+
+    print('')
+    print('%-*s Success rate (%%) by frequency (Hz)' % (label_width, ''))
+    print('%-*s %s' % (label_width, '', 
+                       ' '.join('%*d' % (col_width, freq) for freq in freqs)))
+    for (mode, delay) in rows:
+        print('%-*s %s' % (label_width, MatrixRowLabel(mode, delay, args),
+                           ' '.join('%*.1f' % (col_width, 
+                                               grid[(mode, delay, freq)].SuccessRate() * 100.0)
+                                    for freq in freqs)))
+
+
+def SaveHeatmap(grid: dict, rows: list, freqs: list, args) -> None:
+    '''
+    Saves the success rate of every matrix point as a PNG heatmap
+
+    :param grid: Dictionary of (mode, delay, freq) and exercise results
+    :param rows: List of (mode, delay) rows
+    :param freqs: List of frequencies
+    :param args: Parsed command line arguments
+    '''
+    #Import here so matplotlib is only needed for heatmaps
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print('matplotlib is required for --heatmap, no heatmap saved')
+        return
+
+    rates = [[grid[(mode, delay, freq)].SuccessRate() * 100.0 for freq in freqs]
+             for (mode, delay) in rows]
+
+    (fig, ax) = plt.subplots(figsize=(max(6, len(freqs) * 0.6), max(3, len(rows) * 0.5)))
+    image = ax.imshow(rates, cmap='RdYlGn', vmin=0.0, vmax=100.0, aspect='auto')
+    ax.set_xticks(range(0, len(freqs)))
+    ax.set_xticklabels([str(freq) for freq in freqs], rotation=90)
+    ax.set_yticks(range(0, len(rows)))
+    ax.set_yticklabels([MatrixRowLabel(mode, delay, args) for (mode, delay) in rows])
+    ax.set_xlabel('Frequency (Hz)')
+    ax.set_title('%s on %s' % (ExerciserName(args.exerciser), 
+                               InterfaceName(args.interface)))
+    fig.colorbar(image, ax=ax, label='Success rate (%)')
+    fig.tight_layout()
+    fig.savefig(args.heatmap)
+    plt.close(fig)
+
+
+def RunSoak(args, sink: IResultSink) -> None:
+    '''
+    Runs the exercise over and over for the soak duration, cycling through
+    the frequencies. Every interval each frequency's rounds are reported as
+    a point, followed by its rolling and total rates, error bursts and the
+    time since its last error. The frames either side of each failed frame
+    in a round are dumped, up to the capture limit. Ctrl-C ends the soak
+    early with a final report.
+
+    :param args: Parsed command line arguments
+    :param sink: Result output, or None
+    '''
+    target = SweepTarget(None, args.interface, args.bus_num, args.cs_num,
+                         args.exerciser, None, None, None)
+    spi = CreateInterface(args.interface, args.bus_num, args.cs_num, 
+                          args.exerciser, args)
+    exerciser = CreateExerciser(args.exerciser, args)
+
+    #Keep the frames around each error, dumped alongside any trace
+    from ErrorCapture import ErrorCapture
+
+    stream = None
+    if args.trace_file is not None:
+        stream = open(args.trace_file, 'a')
+    if args.soak_captures > 0:
+        ErrorCapture.Enable(SOAK_CAPTURE_SLOTS, args.soak_context, args.trace_bytes, stream)
+
+    freqs = BuildFreqSet(args)
+    stats = { freq: SoakStats(args.soak_windows) for freq in freqs }
+
+    #Bus statistics only make sense for a single frequency
+    instrumented = FindInstrumented(spi)
+    if len(freqs) != 1:
+        instrumented = None
+
+    def Report(now: float) -> None:
+        for freq in freqs:
+            window = stats[freq].EndWindow()
+            if window is None:
+                continue
+            if instrumented is not None:
+                window.bus_stats = instrumented.Stats()
+                instrumented.Reset()
+            ReportPoint(target, freq, window, args, sink)
+            PrintSoakStats(stats[freq], now - start, now)
+
+    engine = CreateEngine(args)
+    captures = 0
+    start = time.monotonic()
+    end = start + args.soak
+    next_report = start + args.soak_interval
+    if instrumented is not None:
+        instrumented.Reset()
+
+    try:
+        now = start
+        while now < end:
+            for freq in freqs:
+                result = RunRound(spi, exerciser, freq, engine=engine)
+                now = time.monotonic()
+                stats[freq].Add(result, now)
+
+                #Passing rounds keep nothing, so each capture holds just the
+                #frames around this round's errors
+                if (result.success_count < result.test_count) and \
+                   (ErrorCapture.active is not None):
+                    ErrorCapture.active.Dump('Failures at %d Hz, %s into the soak' % 
+                        (freq, datetime.timedelta(seconds=int(now - start))))
+                    captures += 1
+                    if captures >= args.soak_captures:
+                        ErrorCapture.Disable()
+
+                time.sleep(args.delay_ms / 1000.0)
+
+            if now >= next_report:
+                Report(now)
+                while next_report <= now:
+                    next_report += args.soak_interval
+    except KeyboardInterrupt:
+        print('Soak interrupted')
+    finally:
+        now = time.monotonic()
+        Report(now)
+        spi.Cleanup()
+        ErrorCapture.Disable()
+        if stream is not None:
+            stream.close()
+
+    print('')
+    for freq in freqs:
+        total = stats[freq].total
+        if total is None:
+            continue
+        print('Freq: %-9d Hz, %d rounds in %s, Result: %.4f%%, BER: %.3e, ' 
+              '%d rounds with errors' % 
+              (freq, stats[freq].rounds, datetime.timedelta(seconds=int(now - start)),
+               total.SuccessRate() * 100.0, total.BitErrorRate(), 
+               stats[freq].error_rounds))
+
+
+def PrintSoakStats(stats: SoakStats, elapsed: float, now: float) -> None:
+    '''
+    Prints the soak statistics of a frequency after its interval report
+
+    :param stats: Soak statistics of the frequency
+    :param elapsed: Seconds since the soak started
+    :param now: Current time, in seconds
+    '''
+    (rate, ber) = stats.Rolling()
+    total = stats.total
+    print('    Soak %s, %d rounds. Last %d intervals: %.4f%%, BER: %.3e. '
+          'Total: %.4f%%, BER: %.3e' % 
+          (datetime.timedelta(seconds=int(elapsed)), stats.rounds, stats.Windows(),
+           rate * 100.0, ber, total.SuccessRate() * 100.0, total.BitErrorRate()))
+
+    if stats.last_error is None:
+        print('    No errors')
+        return
+
+    bursts = ' '.join('%s:%d' % (BurstBucketLabel(i), count)
+                      for (i, count) in enumerate(total.error_bursts) if count > 0)
+    print('    Error bursts (frames): %s, longest %d. Last error %s ago' % 
+          (bursts, total.max_burst, 
+           datetime.timedelta(seconds=int(now - stats.last_error))))
+
+
+def BurstBucketLabel(bucket: int) -> str:
+    '''
+    :param bucket: Index into ExerciseResult.error_bursts
+    :return: Range of burst lengths in frames the bucket counts, e.g. 4-7
+    '''
+    if bucket == 0:
+        return '1'
+    elif bucket == BURST_BUCKETS - 1:
+        return '%d+' % (1 << bucket)
+    return '%d-%d' % (1 << bucket, (2 << bucket) - 1)
+
+
+def BuildFreqSet(args) -> list:
+    '''
+    Builds the list of frequencies to run from the command line arguments
+
+    :param args: Parsed command line arguments
+    :return: Sorted list of frequencies in Hz
+    '''
     #Create a list of the frequencies to run
     freq_set = [*range(args.start_freq, args.end_freq, args.step_freq)]
 
@@ -86,15 +623,734 @@ def RunMain(args):
     
     #probably dont need to do this, should be sorted from range + end_freq
     freq_set.sort()
+    return freq_set
 
-    #Run all the frequencies
-    for freq in freq_set:
+
+def RunSweep(spi: ISPI, exerciser: IExerciser, target: SweepTarget, args,
+             lock: threading.Lock = None, report = None) -> None:
+    '''
+    Runs every frequency of the sweep. With a result cache, points already
+    measured are reported from the cache, unless forced, and new points are
+    stored as soon as they complete
+
+    :param spi: Interface to run the exercise on
+    :param exerciser: Exerciser to run
+    :param target: Target the sweep runs on
+    :param args: Parsed command line arguments
+    :param lock: Optional bus lock held while each exercise runs
+    :param report: Optional function(freq, result) to report each point to
+    '''
+    if args.interleave:
+        RunInterleavedSweep(spi, exerciser, args, lock, report)
+        return
+
+    #One engine for the whole sweep, so its buffers are reused point to point
+    engine = CreateEngine(args)
+    if args.cache is None:
+        for freq in BuildFreqSet(args):
+            RunPoint(spi, exerciser, freq, args, lock, report, engine)
+        return
+
+    #import here so sqlite is only loaded with a cache
+    from ResultCache import ResultCache
+    cache = ResultCache(args.cache)
+    try:
+        key = CacheKey(target, args)
+        for freq in BuildFreqSet(args):
+            result = None if args.force else cache.Get(key, freq)
+            if result is None:
+                result = RunPoint(spi, exerciser, freq, args, lock, report, engine)
+                cache.Put(key, freq, result)
+            elif report is not None:
+                report(freq, result)
+    finally:
+        cache.Close()
+
+
+def RunInterleavedSweep(spi: ISPI, exerciser: IExerciser, args,
+                        lock: threading.Lock = None, report = None) -> None:
+    '''
+    Runs every frequency of the sweep in a single TransferSpeeds submission,
+    the exercise's batches at each frequency taking turns and each frame
+    clocked at its own speed. On spidev this is a handful of ioctls for the
+    whole sweep, with no speed changes or host delays between points to 
+    drift across. The results are bucketed by frequency and reported in
+    order
+
+    :param spi: Interface to run the exercise on
+    :param exerciser: Exerciser to run, its exercise must be built up front
+    :param args: Parsed command line arguments
+    :param lock: Optional bus lock held while the sweep runs
+    :param report: Optional function(freq, result) to report each point to
+    '''
+    freqs = BuildFreqSet(args)
+    plans = [exerciser.BuildExercise() for freq in freqs]
+    if plans[0] is None:
+        raise Exception('The %s exercise can\'t be built up front to interleave' %
+                        ExerciserName(type(exerciser)))
+
+    if lock is None:
+        elapsed = RunPlansInterleaved(spi, plans, freqs)
+    else:
+        with lock:
+            elapsed = RunPlansInterleaved(spi, plans, freqs)
+
+    logging.info('Interleaved %d frequencies in %.3f s', len(freqs), elapsed)
+
+    #The trace holds the whole sweep, dump it once
+    if (Trace.active is not None) and any(plan.result.success_count < plan.result.test_count
+                                          for plan in plans):
+        Trace.active.Dump('Failures in interleaved sweep')
+
+    if report is not None:
+        for freq, plan in zip(freqs, plans):
+            report(freq, plan.result)
+
+
+def RunPoint(spi: ISPI, exerciser: IExerciser, freq: int, args,
+             lock: threading.Lock = None, report = None,
+             engine: PipelinedEngine = None) -> ExerciseResult:
+    '''
+    Runs the exercise at a single frequency and reports the result, with
+    the host wall time of the exercise
+
+    :param spi: Interface to run the exercise on
+    :param exerciser: Exerciser to run
+    :param freq: SPI clock frequency in Hz
+    :param args: Parsed command line arguments
+    :param lock: Optional bus lock held while the exercise runs
+    :param report: Optional function(freq, result) to report the result to
+    :param engine: Optional engine to run built exercises on, from 
+                   CreateEngine
+    :return: Exercise result
+    '''
+    instrumented = FindInstrumented(spi)
+    if instrumented is not None:
+        instrumented.Reset()
+
+    if args.sequential:
+        #Repeat the exercise until the sequential test decides pass or fail.
+        #The test is fed batch by batch, so the decision can end a round early
+        test = SequentialTest(args.max_error_rate, args.confidence)
+        result = RunRound(spi, exerciser, freq, lock, engine, test)
+        while (test.Decision() == SPRT_UNDECIDED) and (result.rounds < args.max_rounds):
+            result.Merge(RunRound(spi, exerciser, freq, lock, engine, test))
+        result.decision = test.Decision()
+    else:
+        result = RunRound(spi, exerciser, freq, lock, engine)
+
+    if instrumented is not None:
+        result.bus_stats = instrumented.Stats()
+
+    #Dump the transactions leading up to any failures
+    if (Trace.active is not None) and (result.success_count < result.test_count):
+        Trace.active.Dump('Failures at %d Hz' % freq)
+
+    if report is not None:
+        report(freq, result)
+
+    #Delay if the user requested
+    time.sleep(args.delay_ms / 1000.0)
+
+    return result
+
+
+def RunRound(spi: ISPI, exerciser: IExerciser, freq: int, 
+             lock: threading.Lock = None, 
+             engine: PipelinedEngine = None,
+             test: SequentialTest = None) -> ExerciseResult:
+    '''
+    Runs the exercise once at a single frequency, timing it
+
+    :param spi: Interface to run the exercise on
+    :param exerciser: Exerciser to run
+    :param freq: SPI clock frequency in Hz
+    :param lock: Optional bus lock held while the exercise runs
+    :param engine: Optional engine to run built exercises on
+    :param test: Optional sequential test to feed, see RunExercise
+    :return: Exercise result
+    '''
+    if lock is None:
         spi.SetSpeed(freq)
-        result = exerciser.RunExercise(spi)
-        print('Freq: %-9d Hz, Result: %.2f%%' % (freq, result * 100.0))
+        start = time.perf_counter()
+        result = RunExercise(spi, exerciser, engine, test)
+        result.wall_time = time.perf_counter() - start
+    else:
+        with lock:
+            spi.SetSpeed(freq)
+            start = time.perf_counter()
+            result = RunExercise(spi, exerciser, engine, test)
+            result.wall_time = time.perf_counter() - start
+    return result
+
+
+def RunExercise(spi: ISPI, exerciser: IExerciser, 
+                engine: PipelinedEngine = None,
+                test: SequentialTest = None) -> ExerciseResult:
+    '''
+    Runs the exercise, on the engine when given one and the exercise can be
+    built up front
+
+    :param spi: Interface to run the exercise on
+    :param exerciser: Exerciser to run
+    :param engine: Optional engine to run built exercises on
+    :param test: Optional sequential test fed with each verified batch of
+                 a built exercise, which stops sending batches once the test
+                 decides. Exercises which can't be built feed it once done
+    :return: Exercise result
+    '''
+    if (engine is not None) or (test is not None):
+        plan = exerciser.BuildExercise()
+        if plan is not None:
+            if test is not None:
+                plan = SequentialPlan(plan, test)
+            if engine is None:
+                return RunPlan(spi, plan)
+            return engine.Run(spi, plan)
+
+    result = exerciser.RunExercise(spi)
+    if test is not None:
+        test.Add(result.test_count, result.test_count - result.success_count)
+    return result
+
+
+def SequentialPlan(plan: ExercisePlan, test: SequentialTest) -> ExercisePlan:
+    '''
+    Wraps a built exercise to feed a sequential test with the tests and
+    failures of each batch as it is verified. No further batches are sent
+    once the test has decided, although a pipelined run still sends the
+    few batches already queued
+
+    :param plan: Built exercise
+    :param test: Sequential test to feed
+    :return: Built exercise sending the plan's batches until the test decides
+    '''
+    def Feed(batch: ExerciseBatch) -> ExerciseBatch:
+        def Verify(result: ExerciseResult, received: list) -> None:
+            tests = result.test_count
+            successes = result.success_count
+            if batch.verify is not None:
+                batch.verify(result, received)
+            tests = result.test_count - tests
+            test.Add(tests, tests - (result.success_count - successes))
+        return batch._replace(verify=Verify)
+
+    def Batches():
+        for batch in plan.batches:
+            if test.Decision() != SPRT_UNDECIDED:
+                return
+            yield Feed(batch)
+
+    return plan._replace(batches=Batches())
+
+
+def CreateEngine(args) -> PipelinedEngine:
+    '''
+    :param args: Parsed command line arguments
+    :return: Engine to run the exercises on, None to run them directly
+    '''
+    if args.pipeline == 0:
+        return None
+    return PipelinedEngine(args.pipeline)
+
+
+def PointPasses(result: ExerciseResult, args) -> bool:
+    '''
+    :param result: Exercise result of a frequency point
+    :param args: Parsed command line arguments
+    :return: True if the sequential test passed the point, or without a
+             decision if the success rate meets the threshold
+    '''
+    if result.decision in (SPRT_PASS, SPRT_FAIL):
+        return result.decision == SPRT_PASS
+    return (result.SuccessRate() * 100.0) >= args.threshold
+
+
+def ReportPoint(target: SweepTarget, freq: int, result: ExerciseResult, 
+                args, sink: IResultSink = None) -> None:
+    '''
+    Prints the result of a single frequency point and writes it to the
+    result output
+
+    :param target: Target the point was run on
+    :param freq: SPI clock frequency in Hz
+    :param result: Exercise result
+    :param args: Parsed command line arguments
+    :param sink: Result output, or None
+    '''
+    prefix = '' if target.name is None else ('%s ' % target.name)
+    print('%sFreq: %-9d Hz, Result: %.2f%%, BER: %.3e%s' % 
+          (prefix, freq, result.SuccessRate() * 100.0, result.BitErrorRate(),
+           ' (cached)' if result.cached else ''))
+
+    if (result.seed is not None) and (result.success_count < result.test_count):
+        print('    Replay with: --pattern %s --seed %d' % (result.pattern, result.seed))
+
+    if result.decision is not None:
+        print('    Sequential test: %s after %d rounds, %d frames' % 
+              (DECISION_NAMES[result.decision], result.rounds, result.test_count))
+
+    if args.bit_stats:
+        PrintBitStats(result)
+
+    if result.payload_bytes > 0:
+        print('    Payload: %d bytes at %.0f B/s, %.1f%% of the clock rate' % 
+              (result.payload_bytes, result.PayloadThroughput(), 
+               result.PayloadUtilization(freq) * 100.0))
+
+    if result.stream_reads > 0:
+        print('    Stream: %d reads, %d samples, %d duplicated, ~%d dropped (host timing)' % 
+              (result.stream_reads, result.stream_samples, 
+               result.stream_duplicated, result.stream_dropped))
+
+    if result.bus_stats is not None:
+        PrintBusStats(result.bus_stats)
+
+    if sink is not None:
+        sink.Write({ 'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                     'interface': InterfaceName(target.interface),
+                     'bus': target.bus,
+                     'cs': target.cs,
+                     'exerciser': ExerciserName(target.exerciser),
+                     'mode': result.mode,
+                     'freq': freq,
+                     'test_count': result.test_count,
+                     'success_count': result.success_count,
+                     'success_rate': result.SuccessRate(),
+                     'bit_errors': result.bit_errors,
+                     'bits_compared': result.bits_compared,
+                     'ber': result.BitErrorRate(),
+                     'transfer_count': result.transfer_count,
+                     'wall_time': result.wall_time,
+                     'tps': result.TransfersPerSecond(),
+                     'payload_bytes': result.payload_bytes,
+                     'payload_throughput': result.PayloadThroughput(),
+                     'payload_utilization': result.PayloadUtilization(freq),
+                     'stream_samples': result.stream_samples,
+                     'stream_duplicated': result.stream_duplicated,
+                     'stream_dropped': result.stream_dropped,
+                     'rounds': result.rounds,
+                     'decision': None if result.decision is None else DECISION_NAMES[result.decision],
+                     'cached': result.cached,
+                     'word_delay': result.word_delay,
+                     'pattern': result.pattern,
+                     'seed': result.seed,
+                     **{ key: None if result.bus_stats is None else result.bus_stats[key]
+                         for key in BUS_STAT_FIELDS } })
+
+
+def RunSearch(spi: ISPI, exerciser: IExerciser, args, 
+              lock: threading.Lock = None, report = None) -> int:
+    '''
+    Searches for the highest passing frequency rather than running every
+    step. A coarse, geometrically spaced sweep locates the first pass to fail
+    transition, which is then bisected down to the step size. A frequency
+    only passes if every one of the confirmation runs passes.
+
+    :param spi: Interface to run the exercise on
+    :param exerciser: Exerciser to run
+    :param args: Parsed command line arguments
+    :param lock: Optional bus lock held while each exercise runs
+    :param report: Optional function(freq, result) to report each point to
+    :return: Highest passing frequency in Hz, None if nothing passes
+    '''
+    engine = CreateEngine(args)
+
+    def Passes(freq: int) -> bool:
+        for i in range(0, args.search_confirm):
+            result = RunPoint(spi, exerciser, freq, args, lock, report, engine)
+            if not PointPasses(result, args):
+                return False
+        return True
+
+    #Coarse points, geometric so a wide span isn't dominated by its top end
+    start = max(args.start_freq, 1)
+    ratio = (args.end_freq / start) ** (1.0 / max(args.search_points - 1, 1))
+    coarse = sorted({ int(round(start * (ratio ** i))) 
+                      for i in range(0, args.search_points) } | 
+                    { args.end_freq })
+
+    last_pass = None
+    first_fail = None
+    for freq in coarse:
+        if Passes(freq):
+            last_pass = freq
+        else:
+            first_fail = freq
+            break
+
+    if last_pass is None:
+        return None
+
+    if first_fail is not None:
+        #Bisect the transition down to the requested resolution
+        while (first_fail - last_pass) > args.step_freq:
+            mid = (last_pass + first_fail) // 2
+            if Passes(mid):
+                last_pass = mid
+            else:
+                first_fail = mid
+
+    return last_pass
+
+
+def PrintSearchResult(max_freq: int, args, label: str = None) -> None:
+    '''
+    Prints the outcome of a search
+
+    :param max_freq: Highest passing frequency, None if nothing passed
+    :param args: Parsed command line arguments
+    :param label: Target name to prefix the output with, or None
+    '''
+    prefix = '' if label is None else ('%s: ' % label)
+    if max_freq is None:
+        print('%sNo frequency passes the %.2f%% threshold' % 
+              (prefix, args.threshold))
+    else:
+        print('%sMax passing frequency: %d Hz (threshold %.2f%%, resolution %d Hz)' %
+              (prefix, max_freq, args.threshold, args.step_freq))
+
+
+def TargetArgs(target: SweepTarget, args):
+    '''
+    Applies a target's own frequency range, if it has one, to a copy of the
+    command line arguments
+
+    :param target: Sweep target
+    :param args: Parsed command line arguments
+    :return: Arguments to run the target with
+    '''
+    target_args = argparse.Namespace(**vars(args))
+    if target.start_freq is not None:
+        target_args.start_freq = target.start_freq
+        target_args.end_freq = target.end_freq
+        target_args.step_freq = target.step_freq
+    return target_args
+
+
+def RunTarget(target: SweepTarget, args, results, 
+              lock: threading.Lock = None) -> None:
+    '''
+    Runs the sweep or search on a single target. Results are posted to a
+    queue rather than printed, so this can run in a worker thread or process.
+
+    Records are tuples of (kind, target name, data...):
+        ('point', name, freq, result)
+        ('search', name, max passing freq)
+        ('error', name, message)
+
+    :param target: Target to run
+    :param args: Parsed command line arguments
+    :param results: Queue to post result records to
+    :param lock: Optional bus lock held while each exercise runs
+    '''
+    def Report(freq: int, result: ExerciseResult) -> None:
+        results.put(('point', target.name, freq, result))
+
+    args = TargetArgs(target, args)
+    try:
+        spi = CreateInterface(target.interface, target.bus, target.cs, 
+                              target.exerciser, args)
+    except Exception as e:
+        results.put(('error', target.name, str(e)))
+        return
+
+    try:
+        exerciser = CreateExerciser(target.exerciser, args)
+        if args.search:
+            results.put(('search', target.name, 
+                         RunSearch(spi, exerciser, args, lock, Report)))
+        else:
+            RunSweep(spi, exerciser, target, args, lock, Report)
+    except Exception as e:
+        results.put(('error', target.name, str(e)))
+    finally:
+        spi.Cleanup()
+
+
+def RunTargetGroup(index: int, targets: list, args, results, 
+                   lock: threading.Lock = None) -> None:
+    '''
+    Worker entry point. Runs a group of targets one after the other and posts
+    a ('done', index) record when finished
+
+    :param index: Index of the worker, posted with its 'done' record
+    :param targets: List of targets to run
+    :param args: Parsed command line arguments
+    :param results: Queue to post result records to
+    :param lock: Optional bus lock held while each exercise runs
+    '''
+    #Worker processes don't always inherit the parent's trace
+    if (args.trace is not None) and (Trace.active is None):
+        EnableTrace(args)
+
+    for target in targets:
+        RunTarget(target, args, results, lock)
+    results.put(('done', index))
+
+
+def RunTargets(args, sink: IResultSink) -> None:
+    '''
+    Runs the sweep on several targets at once and aggregates the results per
+    target. 
+
+    By default each target runs in its own thread. Targets on the same bus
+    share a lock so their exercises don't overlap, targets on separate buses
+    run in parallel.
+
+    With --processes, targets are grouped by bus and each group runs in its
+    own worker process, streaming results back over a queue. A worker which
+    dies without finishing, i.e. a crash in a native interface library, is
+    reported as an error against its targets rather than waited on.
+
+    :param args: Parsed command line arguments
+    :param sink: Result output, or None
+    '''
+    #Group the targets by physical bus
+    bus_groups = {}
+    for target in args.targets:
+        bus_groups.setdefault((target.interface, target.bus), []).append(target)
+
+    #(worker, targets it runs)
+    workers = []
+    if args.processes:
+        import multiprocessing
+        results = multiprocessing.Queue()
+        for group in bus_groups.values():
+            worker = multiprocessing.Process(target=RunTargetGroup, 
+                                             args=(len(workers), group, args, results))
+            workers.append((worker, group))
+        for (worker, group) in workers:
+            worker.start()
+    else:
+        results = queue.Queue()
+        for group in bus_groups.values():
+            lock = threading.Lock()
+            for target in group:
+                worker = threading.Thread(target=RunTargetGroup,
+                                          args=(len(workers), [target], args, results, lock))
+                workers.append((worker, [target]))
+                worker.start()
 
-        #Delay if the user requested
-        time.sleep(args.delay_ms / 1000.0)
+    #Report the results as they come in
+    targets = { target.name: target for target in args.targets }
+    points = { target.name: [] for target in args.targets }
+    searches = {}
+    errors = {}
+    done = set()
+
+    def Handle(record: tuple) -> None:
+        if record[0] == 'done':
+            done.add(record[1])
+        elif record[0] == 'point':
+            (kind, name, freq, result) = record
+            ReportPoint(targets[name], freq, result, args, sink)
+            points[name].append((freq, result))
+        elif record[0] == 'search':
+            searches[record[1]] = record[2]
+        else:
+            errors[record[1]] = record[2]
+
+    while len(done) < len(workers):
+        try:
+            Handle(results.get(timeout=WORKER_POLL_SECONDS))
+            continue
+        except queue.Empty:
+            pass
+
+        dead = [index for index, (worker, group) in enumerate(workers)
+                if (index not in done) and (not worker.is_alive())]
+        if not dead:
+            continue
+
+        #A worker's records are flushed before it exits, take any left
+        #behind its last check in
+        try:
+            while True:
+                Handle(results.get(timeout=WORKER_POLL_SECONDS))
+        except queue.Empty:
+            pass
+
+        for index in dead:
+            if index in done:
+                continue
+            (worker, group) = workers[index]
+            exitcode = getattr(worker, 'exitcode', None)
+            for target in group:
+                errors.setdefault(target.name, 'Worker exited without finishing' +
+                                  ('' if exitcode is None else ' (exit code %d)' % exitcode))
+            done.add(index)
+
+    for (worker, group) in workers:
+        worker.join()
+
+    PrintTargetSummary(args, points, searches, errors)
+
+
+def PrintTargetSummary(args, points: dict, searches: dict, errors: dict) -> None:
+    '''
+    Prints the aggregated results of each target of a multi target run
+
+    :param args: Parsed command line arguments
+    :param points: Target name to list of (freq, result) of its points
+    :param searches: Target name to max passing frequency, in search mode
+    :param errors: Target name to the error which stopped it
+    '''
+    print('')
+    for target in args.targets:
+        if target.name in errors:
+            print('%s: Failed, %s' % (target.name, errors[target.name]))
+        elif args.search:
+            PrintSearchResult(searches.get(target.name), args, target.name)
+        else:
+            results = points[target.name]
+            passing = [freq for (freq, result) in results 
+                       if PointPasses(result, args)]
+            tests = sum(result.test_count for (freq, result) in results)
+            successes = sum(result.success_count for (freq, result) in results)
+            print('%s: %d points, %d/%d frames passed, max passing frequency: %s' %
+                  (target.name, len(results), successes, tests,
+                   ('%d Hz' % max(passing)) if passing else 'None'))
+
+
+def RunTargetsAsync(args, sink: IResultSink) -> None:
+    '''
+    Runs the sweep on every target from a single asyncio event loop. Each
+    target's interface is adapted with SPI_executor, so its bus I/O runs in
+    a worker thread while the loop verifies the results of the others.
+    Targets on the same bus share a lock so their exercises don't overlap,
+    and at most --max-concurrent exercises run at once.
+
+    :param args: Parsed command line arguments
+    :param sink: Result output, or None
+    '''
+    import asyncio
+
+    targets = { target.name: target for target in args.targets }
+    points = { target.name: [] for target in args.targets }
+    errors = {}
+
+    def Report(target: SweepTarget, freq: int, result: ExerciseResult) -> None:
+        ReportPoint(target, freq, result, args, sink)
+        points[target.name].append((freq, result))
+
+    async def RunAll() -> None:
+        limit = asyncio.Semaphore(args.max_concurrent)
+        bus_locks = {}
+        for target in args.targets:
+            bus_locks.setdefault((target.interface, target.bus), asyncio.Lock())
+
+        outcomes = await asyncio.gather(*[
+            RunTargetAsync(target, args, bus_locks[(target.interface, target.bus)],
+                           limit, Report)
+            for target in args.targets])
+
+        for (target, error) in zip(args.targets, outcomes):
+            if error is not None:
+                errors[target.name] = error
+
+    asyncio.run(RunAll())
+    PrintTargetSummary(args, points, {}, errors)
+
+
+async def RunTargetAsync(target: SweepTarget, args, bus_lock: 'asyncio.Lock',
+                         limit: 'asyncio.Semaphore', report) -> str:
+    '''
+    Runs the sweep on a single target from the event loop
+
+    :param target: Target to run
+    :param args: Parsed command line arguments
+    :param bus_lock: Lock of the target's bus, held while each exercise runs
+    :param limit: Semaphore bounding the exercises running at once
+    :param report: function(target, freq, result) to report each point to
+    :return: None on success, otherwise the error which stopped the target
+    '''
+    import asyncio
+    from Interfaces.SPI_executor import SPI_executor
+
+    args = TargetArgs(target, args)
+    try:
+        blocking = CreateInterface(target.interface, target.bus, target.cs, 
+                                   target.exerciser, args)
+    except Exception as e:
+        return str(e)
+
+    spi = SPI_executor(blocking)
+    instrumented = FindInstrumented(blocking)
+    try:
+        exerciser = CreateExerciser(target.exerciser, args)
+        for freq in BuildFreqSet(args):
+            async with bus_lock:
+                async with limit:
+                    #The executor is idle between exercises, so the 
+                    #statistics can be used directly
+                    if instrumented is not None:
+                        instrumented.Reset()
+
+                    await spi.SetSpeed(freq)
+                    start = time.perf_counter()
+                    result = await exerciser.RunExerciseAsync(spi, args.async_depth)
+                    result.wall_time = time.perf_counter() - start
+
+                    if instrumented is not None:
+                        result.bus_stats = instrumented.Stats()
+
+            #Dump the transactions leading up to any failures
+            if (Trace.active is not None) and (result.success_count < result.test_count):
+                Trace.active.Dump('%s failures at %d Hz' % (target.name, freq))
+
+            report(target, freq, result)
+            await asyncio.sleep(args.delay_ms / 1000.0)
+    except Exception as e:
+        return str(e)
+    finally:
+        await spi.Cleanup()
+
+    return None
+
+
+def PrintBusStats(stats: dict) -> None:
+    '''
+    Prints the bus statistics of an instrumented exercise
+
+    :param stats: Statistics from SPI_instrumented.Stats()
+    '''
+    print('    %d bytes in %d frames, frame latency p50/p90/p99/max: %.1f/%.1f/%.1f/%.1f us' %
+          (stats['bytes'], stats['frames'], stats['latency_p50_ns'] / 1000.0,
+           stats['latency_p90_ns'] / 1000.0, stats['latency_p99_ns'] / 1000.0,
+           stats['latency_max_ns'] / 1000.0))
+    print('    %d calls, call latency p50/p90/p99/max: %.1f/%.1f/%.1f/%.1f us' %
+          (stats['calls'], stats['call_latency_p50_ns'] / 1000.0,
+           stats['call_latency_p90_ns'] / 1000.0, stats['call_latency_p99_ns'] / 1000.0,
+           stats['call_latency_max_ns'] / 1000.0))
+    print('    Throughput: %.0f B/s of %.0f B/s theoretical (%.1f%%)' %
+          (stats['throughput'], stats['theoretical_throughput'], 
+           stats['utilization'] * 100.0))
+
+
+def EnableTrace(args) -> None:
+    '''
+    Enables transaction tracing from the command line arguments
+
+    :param args: Parsed command line arguments
+    '''
+    stream = None
+    if args.trace_file is not None:
+        stream = open(args.trace_file, 'a')
+    Trace.Enable(args.trace, args.trace_bytes, stream)
+
+
+def PrintBitStats(result: ExerciseResult) -> None:
+    '''
+    Prints the bit error histograms of an exercise result
+
+    :param result: Exercise result to print
+    '''
+    print('    %d/%d bits in error' % (result.bit_errors, result.bits_compared))
+    print('    Errors by bit (b7..b0): %s' % 
+          ' '.join(str(x) for x in result.bit_position_errors))
+    print('    Errors by byte offset:  %s' % 
+          ' '.join(str(x) for x in result.byte_offset_errors))
 
 
 def ArgCheckMode(value):
@@ -107,23 +1363,118 @@ def ArgCheckMode(value):
         raise argparse.ArgumentTypeError('%s is not a valid mode' % value)
     return intval
 
+def ArgCheckModes(value):
+    '''
+    Performs an argument check for a comma separated list of SPI modes
+    '''
+    return [ArgCheckMode(mode) for mode in value.split(',')]
+
+def ArgCheckWordDelays(value):
+    '''
+    Performs an argument check for a comma separated list of word delays
+    '''
+    return [ArgCheckPositiveOrZero(delay) for delay in value.split(',')]
+
 def ArgCheckInterface(value):
     '''
-    Performs an argument check for the interface option. Use the INTERFACE_DICT
-    for valid values
+    Performs an argument check for the interface option. Use the INTERFACES
+    registry for valid values
     '''
-    if value.lower() not in INTERFACE_DICT:
-        raise argparse.ArgumentTypeError('%s is not a valid interface' % value)
-    return INTERFACE_DICT[str(value).lower()]
+    if value not in INTERFACES:
+        raise argparse.ArgumentTypeError('%s is not a valid interface, expected one of %s' % 
+                                         (value, ','.join(INTERFACES.Names())))
+    return INTERFACES.Load(value)
 
 def ArgCheckExerciser(value):
     '''
-    Performs an argument check for the exerciser option. Use the EXERCISER_DICT
-    for valid values
+    Performs an argument check for the exerciser option. Use the EXERCISERS
+    registry for valid values
     '''    
-    if value.lower() not in EXERCISER_DICT:
-        raise argparse.ArgumentTypeError('%s is not a valid exerciser' % value)
-    return EXERCISER_DICT[str(value).lower()]
+    if value not in EXERCISERS:
+        raise argparse.ArgumentTypeError('%s is not a valid exerciser, expected one of %s' % 
+                                         (value, ','.join(EXERCISERS.Names())))
+    return EXERCISERS.Load(value)
+
+def ArgCheckPercent(value):
+    '''
+    Performs an argument check for percentages, 0-100 are valid
+    '''
+    floatval = float(value)
+    if ((floatval < 0.0) or (floatval > 100.0)):
+        raise argparse.ArgumentTypeError('%s is not a valid percentage' % value)
+    return floatval
+
+def ArgCheckConfidence(value):
+    '''
+    Performs an argument check for the sequential test confidence, between
+    0.5 and 1 exclusive
+    '''
+    floatval = float(value)
+    if not (0.5 < floatval < 1.0):
+        raise argparse.ArgumentTypeError('%s is not a valid confidence' % value)
+    return floatval
+
+def ArgCheckErrorRate(value):
+    '''
+    Performs an argument check for the sequential test error rate bound. The
+    failing rate is 10x the bound so it must be below 0.1
+    '''
+    floatval = float(value)
+    if not (0.0 < floatval < 0.1):
+        raise argparse.ArgumentTypeError('%s is not a valid error rate, ' % value +
+                                         'expected greater than 0 and less than 0.1')
+    return floatval
+
+def ArgCheckTarget(value):
+    '''
+    Performs an argument check for the target option. Targets are given as
+    interface:bus:cs:exerciser with an optional :start:end:step frequency
+    range
+    '''
+    fields = value.split(':')
+    if len(fields) not in (4, 7):
+        raise argparse.ArgumentTypeError(
+            '%s is not a valid target, expected ' % value +
+            'interface:bus:cs:exerciser[:start:end:step]')
+
+    freq_range = (None, None, None)
+    if len(fields) == 7:
+        freq_range = (ArgCheckPositiveOrZero(fields[4]), 
+                      ArgCheckPositive(fields[5]), ArgCheckPositive(fields[6]))
+        if freq_range[0] > freq_range[1]:
+            raise argparse.ArgumentTypeError(
+                '%s start frequency must be before end frequency' % value)
+
+    return SweepTarget(value, ArgCheckInterface(fields[0]), 
+                       ArgCheckPositiveOrZero(fields[1]), 
+                       ArgCheckPositiveOrZero(fields[2]),
+                       ArgCheckExerciser(fields[3]), *freq_range)
+
+def ArgCheckAardvarkIds(value):
+    '''
+    Performs an argument check for the Aardvark ID list. Either 'all' or a 
+    comma separated list of dongle IDs
+    '''
+    if value.lower() == 'all':
+        return 'all'
+    return [ArgCheckPositive(dongle_id) for dongle_id in value.split(',')]
+
+def ArgCheckDuration(value):
+    '''
+    Parses a duration, seconds or a number with an s, m, h or d suffix
+    '''
+    units = { 's': 1, 'm': 60, 'h': 3600, 'd': 86400 }
+    scale = 1
+    if value[-1:] in units:
+        scale = units[value[-1]]
+        value = value[:-1]
+    try:
+        seconds = float(value) * scale
+    except ValueError:
+        raise argparse.ArgumentTypeError('Invalid duration, e.g. 90, 30m, 8h')
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError('Duration must be greater than 0')
+    return seconds
 
 def ArgCheckPositiveOrZero(value):
     '''
@@ -144,8 +1495,12 @@ def ArgCheckPositive(value):
     return intval
 
 
-if __name__ == "__main__":
-    #define the command line arguments
+def CreateArgParser() -> argparse.ArgumentParser:
+    '''
+    Builds the command line argument parser
+
+    :return: Argument parser
+    '''
     argParser = argparse.ArgumentParser()
     argParser.add_argument('--bus',   dest='bus_num',    type=ArgCheckPositive, 
         default=0,       help='spidev bus number' )
@@ -161,15 +1516,129 @@ if __name__ == "__main__":
         default=0,       help='Delay (in ms) between frequency exercises')
     argParser.add_argument('--debug', dest='debug', action='store_true', 
         help='Enabled debug output')
+    argParser.add_argument('--bitstats', dest='bit_stats', action='store_true', 
+        help='Print bit error histograms for each frequency')
     argParser.add_argument('-e','--exerciser', dest='exerciser', type=ArgCheckExerciser, 
-        default='loopback', help='Select exerciser: ' + ','.join(EXERCISER_DICT.keys()))
+        default='loopback', help='Select exerciser: ' + ','.join(EXERCISERS.Builtins()) + 
+             ' or an installed plugin')
     argParser.add_argument('-i','--interface', dest='interface', type=ArgCheckInterface,
-        default='spidev', help='Select interface:' + ','.join(INTERFACE_DICT.keys()))
+        default='spidev', help='Select interface:' + ','.join(INTERFACES.Builtins()) + 
+             ' or an installed plugin')
     argParser.add_argument('--lbmode', dest='lbmode',   type=ArgCheckMode,
         default=0,  help='SPI mode for the loopback exerciser')
+    argParser.add_argument('--lbblock', dest='lbblock', action='store_true',
+        help='Loopback exerciser generates and verifies payloads as numpy blocks')
+    argParser.add_argument('--iterations', dest='iterations', type=ArgCheckPositive,
+        default=50, help='Loopback exerciser iterations per payload width')
+    argParser.add_argument('--bulk-size', dest='bulk_size', type=ArgCheckPositive,
+        default=65536, help='Bulk exerciser bytes streamed per frequency')
+    argParser.add_argument('--bulk-frame', dest='bulk_frame', type=ArgCheckPositive,
+        default=4096, help='Bulk exerciser bytes per frame (spidev bufsiz limits this)')
+    argParser.add_argument('--ad5592r-pipeline', dest='ad5592r_pipeline', action='store_true',
+        help='AD5592r exerciser clocks each readback out with the next write')
+    argParser.add_argument('--adxl-burst', dest='adxl_burst', action='store_true',
+        help='ADXL355 exerciser verifies register windows in single transactions')
+    argParser.add_argument('--adxl-stream', dest='adxl_stream', type=ArgCheckPositiveOrZero,
+        default=0, help='ADXL355 exerciser data register reads at the output data rate')
+    argParser.add_argument('--adxl-odr', dest='adxl_odr', type=int, choices=(4000, 2000, 1000, 500, 250, 125),
+        default=1000, help='ADXL355 exerciser output data rate (Hz) of the stream test')
+    argParser.add_argument('--pattern', dest='pattern', choices=PATTERN_NAMES,
+        default='random', help='Test pattern the loopback, bulk and ADXL355 exercisers send')
+    argParser.add_argument('--seed', dest='seed', type=ArgCheckPositiveOrZero,
+        default=0, help='Seed of the random and PRBS test patterns')
+    argParser.add_argument('--target', dest='targets', type=ArgCheckTarget,
+        action='append', default=[], 
+        help='Target to sweep as interface:bus:cs:exerciser. May be repeated to run ' +
+             'several targets concurrently (overrides -i, -e, --bus and --cs)')
+    argParser.add_argument('--processes', dest='processes', action='store_true',
+        help='Run targets in worker processes, one per bus, instead of threads')
+    argParser.add_argument('--pipeline', dest='pipeline', type=ArgCheckPositiveOrZero,
+        default=0, help='Run each exercise as concurrent generate, transfer and verify ' +
+                        'stages with queues of this many batches. 0 runs them in sequence')
+    argParser.add_argument('--interleave', dest='interleave', action='store_true',
+        help='Run every frequency of the sweep in one submission, frames clocked at ' +
+             'their own speed and interleaved, rather than one point at a time')
+    argParser.add_argument('--async', dest='use_async', action='store_true',
+        help='Run the targets from one asyncio event loop instead of threads')
+    argParser.add_argument('--max-concurrent', dest='max_concurrent', type=ArgCheckPositive,
+        default=16, help='Most exercises running at once in --async mode')
+    argParser.add_argument('--async-depth', dest='async_depth', type=ArgCheckPositive,
+        default=2, help='Batches each --async exercise keeps in flight')
+    argParser.add_argument('--aardvark-ids', dest='aardvark_ids', type=ArgCheckAardvarkIds,
+        default=None, help='Run the exerciser on several Aardvark dongles, one process each. ' +
+                           '\'all\' or a comma separated list of dongle IDs')
+    argParser.add_argument('--instrument', dest='instrument', action='store_true',
+        help='Measure per transaction latency and throughput of the interface')
+    argParser.add_argument('--trace', dest='trace', type=ArgCheckPositive,
+        default=None, help='Record the last N transactions, dumped on failures and at exit')
+    argParser.add_argument('--trace-bytes', dest='trace_bytes', type=ArgCheckPositive,
+        default=16, help='Bytes recorded per direction per traced transaction')
+    argParser.add_argument('--trace-file', dest='trace_file', default=None,
+        help='File trace dumps are appended to, defaults to stderr')
+    argParser.add_argument('--capture', dest='capture', default=None,
+        help='Append every transaction to this binary capture log')
+    argParser.add_argument('--replay', dest='replay', default=None,
+        help='Capture log the replay interface (-i replay) plays back')
+    argParser.add_argument('-o', '--output', dest='output', default=None,
+        help='Stream a record per frequency point to this file or pipe (- for stdout, ' +
+             'the console report then goes to stderr)')
+    argParser.add_argument('--format', dest='output_format', choices=SINKS.Builtins(),
+        default='jsonl', help='Format of the --output records')
+    argParser.add_argument('--matrix', dest='matrix', action='store_true',
+        help='Sweep every combination of --modes, frequency and --word-delays and ' +
+             'print the success rates as a grid')
+    argParser.add_argument('--modes', dest='modes', type=ArgCheckModes,
+        default=[0, 1, 2, 3], help='Comma separated SPI modes of the --matrix rows')
+    argParser.add_argument('--word-delays', dest='word_delays', type=ArgCheckWordDelays,
+        default=[0], help='Comma separated delays (us) between bytes for --matrix rows')
+    argParser.add_argument('--heatmap', dest='heatmap', default=None,
+        help='Save the --matrix success rates as a PNG heatmap (requires matplotlib)')
+    argParser.add_argument('--cache', dest='cache', default=None,
+        help='Result cache file. Sweeps skip points already in the cache and store ' +
+             'new points as they complete')
+    argParser.add_argument('--force', dest='force', action='store_true',
+        help='Measure every point even if it is in the --cache, replacing it')
+    argParser.add_argument('--search', dest='search', action='store_true',
+        help='Search for the highest passing frequency instead of sweeping every step')
+    argParser.add_argument('--threshold', dest='threshold', type=ArgCheckPercent,
+        default=100.0, help='Success rate (%%) a frequency needs to pass')
+    argParser.add_argument('--search-points', dest='search_points', type=ArgCheckPositive,
+        default=16, help='Number of coarse sweep points in search mode')
+    argParser.add_argument('--search-confirm', dest='search_confirm', type=ArgCheckPositive,
+        default=3, help='Runs that must all pass for a frequency to pass in search mode')
+    argParser.add_argument('--sequential', dest='sequential', action='store_true',
+        help='Repeat each exercise until a sequential test decides pass or fail')
+    argParser.add_argument('--confidence', dest='confidence', type=ArgCheckConfidence,
+        default=0.95, help='Confidence of the sequential test decisions')
+    argParser.add_argument('--max-error-rate', dest='max_error_rate', type=ArgCheckErrorRate,
+        default=0.001, help='Frame error rate a passing frequency may have in the ' +
+                            'sequential test. Frequencies at 10x this rate fail')
+    argParser.add_argument('--max-rounds', dest='max_rounds', type=ArgCheckPositive,
+        default=100, help='Exercise runs per frequency before the sequential test gives up')
+    argParser.add_argument('--soak', dest='soak', type=ArgCheckDuration,
+        default=None, help='Run the exercise repeatedly at the sweep frequencies ' +
+                           'for this long, e.g. 30m or 8h')
+    argParser.add_argument('--soak-interval', dest='soak_interval', type=ArgCheckDuration,
+        default=60.0, help='Time between soak summaries')
+    argParser.add_argument('--soak-windows', dest='soak_windows', type=ArgCheckPositive,
+        default=60, help='Soak summary intervals the rolling rates cover')
+    argParser.add_argument('--soak-captures', dest='soak_captures', type=ArgCheckPositiveOrZero,
+        default=100, help='Most failing rounds whose frames around each error a soak dumps')
+    argParser.add_argument('--soak-context', dest='soak_context', type=ArgCheckPositiveOrZero,
+        default=4, help='Frames either side of each soak error that are dumped')
+    argParser.add_argument('--sim-device', dest='sim_device', choices=SIM_DEVICES,
+        default=None, help='Device emulated by the sim interface. Defaults to the exerciser')
+    argParser.add_argument('--sim-cutoff', dest='sim_cutoff', type=ArgCheckPositive,
+        default=1000000, help='Frequency (Hz) above which the sim interface injects faults')
+    argParser.add_argument('--sim-seed', dest='sim_seed', type=int,
+        default=None, help='Seed for the sim interface fault generator')
+
+    return argParser
+
 
+if __name__ == "__main__":
     #Parse
-    args = argParser.parse_args()
+    args = CreateArgParser().parse_args()
 
     #Setup logging
     if args.debug:
@@ -178,4 +1647,7 @@ if __name__ == "__main__":
     else:
         logging.getLogger().disabled = True
 
+    if args.trace is not None:
+        EnableTrace(args)
+
     RunMain(args)
\ No newline at end of file
@@ -0,0 +1,102 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import math
+
+#Decisions of the sequential test
+SPRT_UNDECIDED = 0
+SPRT_PASS      = 1
+SPRT_FAIL      = 2
+
+class SequentialTest:
+    '''
+    Wald sequential probability ratio test of a frame error rate. Decides
+    between the error rate being at most max_error_rate (pass) and at least 
+    10x that (fail) as soon as the frames seen so far support either at the
+    requested confidence, so clearly good or bad buses are decided after few
+    frames and marginal ones keep collecting samples.
+    '''
+
+    def __init__(self, max_error_rate: float, confidence: float) -> None:
+        '''
+        Class constructor.
+
+        :param max_error_rate: Frame error rate a passing bus may have, 
+                               greater than 0 and less than 0.1
+        :param confidence: Probability of a correct decision at the bounds,
+                           e.g. 0.95
+        '''
+        p0 = max_error_rate
+        p1 = 10.0 * max_error_rate
+        if not ((0.0 < p0) and (p1 < 1.0)):
+            raise Exception('Error rate bound must be greater than 0 and less than 0.1')
+        if not (0.5 < confidence < 1.0):
+            raise Exception('Confidence must be between 0.5 and 1')
+
+        #Log likelihood ratio change per failed and passed frame
+        self.__fail_step = math.log(p1 / p0)
+        self.__pass_step = math.log((1.0 - p1) / (1.0 - p0))
+
+        #Equal error probabilities for both decisions
+        error = 1.0 - confidence
+        self.__fail_bound = math.log((1.0 - error) / error)
+        self.__pass_bound = math.log(error / (1.0 - error))
+
+        self.__llr = 0.0
+        self.frames = 0
+        self.failures = 0
+
+    def Add(self, frames: int, failures: int) -> int:
+        '''
+        Adds verified frames to the test
+
+        :param frames: Number of frames verified
+        :param failures: Number of those frames which failed
+        :return: Decision after the frames, one of the SPRT_ values
+        '''
+        self.frames += frames
+        self.failures += failures
+        self.__llr += (failures * self.__fail_step + 
+                       (frames - failures) * self.__pass_step)
+        return self.Decision()
+
+    def Decision(self) -> int:
+        '''
+        :return: Current decision, one of the SPRT_ values
+        '''
+        if self.__llr >= self.__fail_bound:
+            return SPRT_FAIL
+        elif self.__llr <= self.__pass_bound:
+            return SPRT_PASS
+        return SPRT_UNDECIDED
@@ -0,0 +1,72 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import csv
+import os
+import sys
+from IResultSink import IResultSink, RECORD_FIELDS
+
+class Sink_CSV(IResultSink):
+    '''
+    Implementation of the IResultSink interface class writing CSV, one row per
+    record
+    '''
+
+    def __init__(self, path: str) -> None:
+        '''
+        Class constructor. Opens the output, writing the header row unless
+        appending to a file which already has content
+
+        :param path: File or pipe to append to, '-' for stdout
+        '''
+        super().__init__()
+        if path == '-':
+            self.__file = sys.stdout
+        else:
+            self.__file = open(path, 'a', newline='')
+
+        self.__writer = csv.DictWriter(self.__file, RECORD_FIELDS, 
+                                       extrasaction='ignore')
+        if (not self.__file.seekable()) or (self.__file.tell() == 0):
+            self.__writer.writeheader()
+
+    def Write(self, record: dict) -> None:
+        self.__writer.writerow(record)
+        self.__file.flush()
+        if self.__file.seekable():
+            os.fsync(self.__file.fileno())
+
+    def Close(self) -> None:
+        if self.__file is not sys.stdout:
+            self.__file.close()
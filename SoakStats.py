@@ -0,0 +1,116 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import collections
+from ExerciseResult import ExerciseResult
+
+class SoakStats:
+    '''
+    Statistics of a soak run at one frequency. Rounds are merged into the
+    current window, and closed windows keep only their counts in a fixed 
+    length ring alongside the running totals, so memory stays flat however
+    long the soak runs.
+    '''
+
+    def __init__(self, windows: int) -> None:
+        '''
+        Class constructor.
+
+        :param windows: Number of closed windows the rolling rates cover
+        '''
+        #(test_count, success_count, bits_compared, bit_errors) per window
+        self.__windows = collections.deque(maxlen=windows)
+        self.__window = None
+
+        #All closed windows merged, None until the first closes
+        self.total = None
+
+        #Rounds run, rounds with failures and the time of the last failure
+        self.rounds = 0
+        self.error_rounds = 0
+        self.last_error = None
+
+    def Add(self, result: ExerciseResult, now: float) -> None:
+        '''
+        Adds a round to the current window
+
+        :param result: Exercise result of the round, owned by the stats after
+        :param now: Time the round completed, in seconds
+        '''
+        self.rounds += 1
+        if result.success_count < result.test_count:
+            self.error_rounds += 1
+            self.last_error = now
+
+        if self.__window is None:
+            self.__window = result
+        else:
+            self.__window.Merge(result)
+
+    def EndWindow(self) -> ExerciseResult:
+        '''
+        Closes the current window
+
+        :return: Merged result of the window's rounds, None if it had none
+        '''
+        window = self.__window
+        if window is None:
+            return None
+        self.__window = None
+
+        self.__windows.append((window.test_count, window.success_count,
+                               window.bits_compared, window.bit_errors))
+
+        if self.total is None:
+            #Copy rather than alias, the window is handed to the caller
+            self.total = ExerciseResult()
+            self.total.rounds = 0
+        self.total.Merge(window)
+        return window
+
+    def Rolling(self) -> tuple:
+        '''
+        :return: (success rate, bit error rate) over the closed windows in 
+                 the ring
+        '''
+        (tests, successes, bits, errors) = [sum(x) for x in zip(*self.__windows)] \
+                                           if self.__windows else (0, 0, 0, 0)
+        return ((float(successes) / tests) if tests > 0 else 0.0,
+                (float(errors) / bits) if bits > 0 else 0.0)
+
+    def Windows(self) -> int:
+        '''
+        :return: Number of closed windows the rolling rates cover
+        '''
+        return len(self.__windows)
@@ -0,0 +1,163 @@
+'''
+ * Copyright (C) 2023 Analog Devices, Inc.
+ *
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *  - Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ *  - Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in
+ *    the documentation and/or other materials provided with the
+ *    distribution.
+ *  - Neither the name of Analog Devices, Inc. nor the names of its
+ *    contributors may be used to endorse or promote products derived
+ *    from this software without specific prior written permission.
+ *  - The use of this software may or may not infringe the patent rights
+ *    of one or more patent holders.  This license does not release you
+ *    from the requirement that you obtain separate licenses from these
+ *    patent holders to use this software.
+ *  - Use of the software either in source or binary form, must be run
+ *    on or directly connected to an Analog Devices Inc. component.
+ *
+ * THIS SOFTWARE IS PROVIDED BY ANALOG DEVICES "AS IS" AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, NON-INFRINGEMENT,
+ * MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL ANALOG DEVICES BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, INTELLECTUAL PROPERTY RIGHTS, PROCUREMENT OF SUBSTITUTE GOODS OR
+ * SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+ * CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+ * OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+import array
+import sys
+import threading
+
+class Trace:
+    '''
+    Records raw transaction bytes into a preallocated ring buffer. Nothing is
+    formatted until the buffer is dumped, so tracing can be left on without
+    slowing the exercisers much.
+
+    Tracing is enabled by setting Trace.active. Hot paths check it once per
+    batch, so the cost when disabled is a single attribute lookup:
+
+        if Trace.active is not None:
+            Trace.active.RecordBatch(frames, received)
+    '''
+
+    #Active trace, None when tracing is disabled
+    active = None
+
+    def __init__(self, slots: int, slot_bytes: int = 16, 
+                 stream = None) -> None:
+        '''
+        Class constructor. Allocates the ring buffer
+
+        :param slots: Number of transactions held, older ones are overwritten
+        :param slot_bytes: Bytes stored per direction per transaction, longer
+                           frames are truncated
+        :param stream: Text stream dumps are written to, defaults to stderr
+        '''
+        self.__stream = sys.stderr if stream is None else stream
+        self.__slots = slots
+        self.__slot_bytes = slot_bytes
+        self.__tx = bytearray(slots * slot_bytes)
+        self.__rx = bytearray(slots * slot_bytes)
+        #Full length of each frame, which may be more than was stored
+        self.__lengths = array.array('I', bytes(4 * slots))
+        #Transactions recorded in total, and at the last dump
+        self.__count = 0
+        self.__dumped = 0
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def Enable(slots: int, slot_bytes: int = 16, stream = None) -> None:
+        '''
+        Enables tracing with a new ring buffer
+
+        :param slots: Number of transactions held
+        :param slot_bytes: Bytes stored per direction per transaction
+        :param stream: Text stream dumps are written to, defaults to stderr
+        '''
+        Trace.active = Trace(slots, slot_bytes, stream)
+
+    @staticmethod
+    def Disable() -> None:
+        '''
+        Disables tracing
+        '''
+        Trace.active = None
+
+    def Record(self, xmit: bytes, rx: bytes) -> None:
+        '''
+        Records a single transaction
+
+        :param xmit: Transmitted bytes
+        :param rx: Received bytes
+        '''
+        with self.__lock:
+            self.__Record(xmit, rx)
+
+    def RecordBatch(self, frames: list, rx_frames: list) -> None:
+        '''
+        Records a batch of transactions
+
+        :param frames: List of transmitted frames
+        :param rx_frames: List of received frames
+        '''
+        with self.__lock:
+            #Only the last slots transactions would survive anyway
+            skip = max(0, len(frames) - self.__slots)
+            self.__count += skip
+            for i in range(skip, len(frames)):
+                self.__Record(frames[i], rx_frames[i])
+
+    def Dump(self, title: str = None) -> None:
+        '''
+        Formats and writes the transactions recorded since the last dump,
+        oldest first. Does nothing if there are none
+
+        :param title: Optional title for the dump
+        '''
+        stream = self.__stream
+        with self.__lock:
+            first = max(self.__dumped, self.__count - self.__slots)
+            if first == self.__count:
+                return
+
+            stream.write('--- Trace: %d transactions%s ---\n' % 
+                         (self.__count - first, 
+                          '' if title is None else (', ' + title)))
+
+            for index in range(first, self.__count):
+                slot = index % self.__slots
+                offset = slot * self.__slot_bytes
+                stored = min(self.__lengths[slot], self.__slot_bytes)
+                more = ' ...' if self.__lengths[slot] > stored else ''
+                stream.write('#%-8d TX: %s%s RX: %s%s\n' % 
+                    (index, self.__tx[offset:offset + stored].hex(' '), more,
+                     self.__rx[offset:offset + stored].hex(' '), more))
+
+            self.__dumped = self.__count
+            stream.flush()
+
+    def __Record(self, xmit: bytes, rx: bytes) -> None:
+        '''
+        Records a transaction, lock must be held
+
+        :param xmit: Transmitted bytes
+        :param rx: Received bytes
+        '''
+        slot = self.__count % self.__slots
+        offset = slot * self.__slot_bytes
+        length = len(xmit)
+        stored = min(length, self.__slot_bytes)
+
+        self.__tx[offset:offset + stored] = memoryview(xmit).cast('B')[:stored]
+        self.__rx[offset:offset + stored] = memoryview(rx).cast('B')[:stored]
+        self.__lengths[slot] = length
+        self.__count += 1